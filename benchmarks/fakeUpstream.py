@@ -0,0 +1,196 @@
+"""
+Local stand-in for the litellm jokes API with latency and fault injection.
+
+Answers every GET with `{"joke": "..."}` after a delay drawn from a latency distribution, and can be told to fail a
+share of requests with an error status, a response without a joke, a hang that only ends with the client's read
+timeout, or a slow-drip body sent a few bytes at a time. Point the app at it with UPSTREAM_JOKES_URL.
+
+    python -m benchmarks.fakeUpstream [--port 8100] [--latency lognormal:3.5,0.5] [--error-rate 0.05]
+                                      [--empty-rate 0.01] [--timeout-rate 0.01] [--drip-rate 0.05]
+
+Latency distributions are in milliseconds: fixed:MS, uniform:LOW,HIGH, normal:MEAN,STDDEV, exponential:MEAN and
+lognormal:MU,SIGMA (of the underlying normal, so lognormal:3.5,0.5 has a median of about 33 ms).
+
+From tests and benchmarks, `FakeUpstream` is a plain ASGI app and `serve` runs it on a free local port:
+
+    async with serve(FakeUpstream(error_rate=0.2)) as url:
+        ...  # set project.jokeUpstream.LITELLM_JOKES_URL = url
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import socket
+from collections import Counter
+from typing import AsyncIterator, Callable
+
+import uvicorn
+
+
+def parseLatency(spec: str, rng: random.Random) -> Callable[[], float]:
+    """
+    Builds a sampler of delays in seconds from a distribution spec such as "normal:50,10" (milliseconds).
+    """
+    name, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    distributions = {
+        "fixed": lambda ms: ms,
+        "uniform": rng.uniform,
+        "normal": rng.gauss,
+        "exponential": lambda mean: rng.expovariate(1 / mean) if mean else 0.0,
+        "lognormal": rng.lognormvariate,
+    }
+    if name not in distributions:
+        raise ValueError(f"Unknown latency distribution: {name}")
+    sample = distributions[name]
+    return lambda: max(0.0, sample(*values)) / 1000
+
+
+class FakeUpstream:
+    """
+    ASGI app that imitates the litellm jokes API. Each request draws its outcome in this order: hang
+    (`timeout_rate`), error status (`error_rate`), response without a joke (`empty_rate`), slow-drip body
+    (`drip_rate`), otherwise a normal joke after a `latency` delay. `counts` tallies the outcomes served.
+    """
+
+    def __init__(
+        self,
+        latency: str = "fixed:20",
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        empty_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        hang_seconds: float = 3600,
+        drip_rate: float = 0.0,
+        drip_chunk_bytes: int = 4,
+        drip_interval: float = 0.2,
+        seed: int = 0,
+    ):
+        self.rng = random.Random(seed)
+        self.latency = parseLatency(latency, self.rng)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.empty_rate = empty_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.drip_rate = drip_rate
+        self.drip_chunk_bytes = drip_chunk_bytes
+        self.drip_interval = drip_interval
+        self.counts: Counter = Counter()
+
+    def _outcome(self) -> str:
+        draw = self.rng.random()
+        for outcome, rate in (
+            ("timeout", self.timeout_rate),
+            ("error", self.error_rate),
+            ("empty", self.empty_rate),
+            ("drip", self.drip_rate),
+        ):
+            if draw < rate:
+                return outcome
+            draw -= rate
+        return "ok"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                await send({"type": "lifespan.startup.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+        outcome = self._outcome()
+        self.counts[outcome] += 1
+        await asyncio.sleep(
+            self.hang_seconds if outcome == "timeout" else self.latency()
+        )
+        status = self.error_status if outcome == "error" else 200
+        if outcome == "error":
+            body = json.dumps({"error": "Injected upstream failure."}).encode()
+        elif outcome == "empty":
+            body = b"{}"
+        else:
+            body = json.dumps(
+                {"joke": f"Fake upstream joke #{self.counts.total()}."}
+            ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        if outcome != "drip":
+            await send({"type": "http.response.body", "body": body})
+            return
+        for offset in range(0, len(body), self.drip_chunk_bytes):
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": body[offset : offset + self.drip_chunk_bytes],
+                    "more_body": True,
+                }
+            )
+            await asyncio.sleep(self.drip_interval)
+        await send({"type": "http.response.body", "body": b""})
+
+
+@contextlib.asynccontextmanager
+async def serve(app: FakeUpstream, host: str = "127.0.0.1") -> AsyncIterator[str]:
+    """
+    Runs `app` on a free local port for the duration of the block.
+
+    Yields:
+        str: The URL to use as UPSTREAM_JOKES_URL.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind((host, 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(app, log_level="warning", timeout_graceful_shutdown=1)
+    )
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    try:
+        while not server.started:
+            if task.done():
+                task.result()
+            await asyncio.sleep(0.01)
+        yield f"http://{host}:{port}/jokes/random"
+    finally:
+        server.should_exit = True
+        await task
+        sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default="fixed:20")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--empty-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=3600)
+    parser.add_argument("--drip-rate", type=float, default=0.0)
+    parser.add_argument("--drip-chunk-bytes", type=int, default=4)
+    parser.add_argument("--drip-interval-ms", type=float, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    fake = FakeUpstream(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        empty_rate=args.empty_rate,
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+        drip_rate=args.drip_rate,
+        drip_chunk_bytes=args.drip_chunk_bytes,
+        drip_interval=args.drip_interval_ms / 1000,
+        seed=args.seed,
+    )
+    print(f"Fake upstream on http://{args.host}:{args.port}/jokes/random")
+    uvicorn.run(fake, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,128 @@
+"""
+Requests/second-per-core benchmark of the JSON response paths of the joke routes.
+
+Fills the joke pool with synthetic jokes and drives the application's router directly over ASGI (no server, no
+database, no middleware) on a single event loop, once with the standard FastAPI response path and once with
+FAST_JSON_RESPONSES enabled (orjson when installed, pre-encoded pool payloads), and reports requests/second for
+each route. Exits non-zero if both paths do not return the same JSON for the same joke.
+
+    python -m benchmarks.jsonResponses [--requests N] [--jokes N]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import project.fastJSON
+import project.jokePool
+import project.server
+
+ROUTES = {
+    "/jokes/random/stored?user_id=bench": (
+        "GET",
+        "/jokes/random/stored",
+        b"user_id=bench",
+    ),
+    "/jokes/random/batch?count=10": ("GET", "/jokes/random/batch", b"count=10"),
+}
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def _scope(method: str, path: str, query_string: bytes) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+        "app": project.server.app,
+    }
+
+
+async def _request(scope: dict) -> bytes:
+    body = []
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await project.server.app.router(scope, _receive, send)
+    return b"".join(body)
+
+
+async def _rate(scope: dict, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        await _request(scope)
+    return requests / (time.perf_counter() - started)
+
+
+def _fill_pool(jokes: int) -> None:
+    pool = project.jokePool.JokePool()
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(jokes):
+        pool._store(
+            SimpleNamespace(
+                id=f"joke-{i:08d}",
+                text=f"Joke number {i}: why did the function return early? It had no more arguments.",
+                source="litellm",
+                createdAt=created + timedelta(seconds=i),
+                updatedAt=created + timedelta(seconds=i, milliseconds=i % 1000),
+            )
+        )
+    project.jokePool.joke_pool = pool
+
+
+async def _same_responses() -> bool:
+    bodies = []
+    for fast in (False, True):
+        project.fastJSON.FAST_JSON_RESPONSES = fast
+        random.seed(0)
+        bodies.append(
+            json.loads(
+                await _request(_scope("GET", "/jokes/random/batch", b"count=50"))
+            )
+        )
+    return bodies[0] == bodies[1]
+
+
+async def main(requests: int, jokes: int) -> int:
+    _fill_pool(jokes)
+    print(f"orjson {'installed' if project.fastJSON.orjson else 'not installed'}")
+    if not await _same_responses():
+        print("FAIL: the standard and fast paths returned different JSON")
+        return 1
+    print(f"{'route':<36} {'standard':>12} {'fast':>12} {'speedup':>8}")
+    for name, (method, path, query_string) in ROUTES.items():
+        scope = _scope(method, path, query_string)
+        rates = []
+        for fast in (False, True):
+            project.fastJSON.FAST_JSON_RESPONSES = fast
+            await _rate(scope, min(requests, 1000))
+            rates.append(await _rate(scope, requests))
+        print(
+            f"{name:<36} {rates[0]:>8.0f} r/s {rates[1]:>8.0f} r/s {rates[1] / rates[0]:>7.2f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--jokes", type=int, default=10_000)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.requests, args.jokes)))
@@ -0,0 +1,290 @@
+"""
+In-process load test of the joke and user APIs.
+
+Runs `project.server:app` over ASGI (no server process, no network) with an in-memory stand-in for the Prisma
+models it touches and a stub litellm upstream, each answering after a configurable simulated round trip (or, with
+`--upstream-url`, a real upstream such as `python -m benchmarks.fakeUpstream` to exercise faults). Every
+scenario is driven by `--concurrency` clients for `--requests` requests; throughput and p50/p95/p99 latency are
+printed as JSON. With `--baseline`, the results are compared with a previous run and the exit status is non-zero
+if any scenario lost more than `--threshold` of its throughput or gained more than `--threshold` on a latency
+percentile.
+
+    python -m benchmarks.loadTest [--concurrency N] [--requests N] [--db-ms MS] [--upstream-ms MS] [--upstream-url URL]
+                                  [--output results.json] [--baseline results.json] [--threshold 0.25]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import prisma.enums
+import prisma.models
+import project.accessLog
+import project.endpointConfig
+import project.jokePool
+import project.jokeUpstream
+import project.jokeWriter
+import project.rateLimiter
+import project.server
+import project.upstreamClient
+import project.userCache
+
+SEED = 20240101
+USERS = 2000
+JOKES = 5000
+
+
+class _FakeUsers:
+    def __init__(self, users, round_trip: float):
+        self.users = sorted(users, key=lambda user: (user.createdAt, user.id))
+        self.by_id = {user.id: user for user in self.users}
+        self.round_trip = round_trip
+
+    @staticmethod
+    def _matches(user, where) -> bool:
+        if "OR" in where:
+            return any(_FakeUsers._matches(user, clause) for clause in where["OR"])
+        for field, condition in where.items():
+            value = getattr(user, field)
+            if isinstance(condition, dict):
+                if "gt" in condition and not value > condition["gt"]:
+                    return False
+                if "in" in condition and value not in condition["in"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    async def find_unique(self, where, **kwargs):
+        await asyncio.sleep(self.round_trip)
+        return self.by_id.get(where["id"])
+
+    async def find_many(self, where=None, take=None, **kwargs):
+        await asyncio.sleep(self.round_trip)
+        where = where or {}
+        ids = (
+            where.get("id", {}).get("in") if isinstance(where.get("id"), dict) else None
+        )
+        if ids is not None:
+            return [self.by_id[user_id] for user_id in ids if user_id in self.by_id]
+        matched = []
+        for user in self.users:
+            if self._matches(user, where):
+                matched.append(user)
+                if len(matched) == take:
+                    break
+        return matched
+
+
+class _FakeWrites:
+    def __init__(self, round_trip: float):
+        self.round_trip = round_trip
+        self.rows = 0
+
+    async def create_many(self, data, **kwargs):
+        await asyncio.sleep(self.round_trip)
+        self.rows += len(data)
+        return len(data)
+
+
+def _installFakes(
+    db_round_trip: float, upstream_round_trip: float, upstream_url: Optional[str]
+) -> None:
+    rng = random.Random(SEED)
+    started = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    users = [
+        SimpleNamespace(
+            id=f"user-{i:06d}",
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            passwordHash="",
+            role=prisma.enums.Role.API_User,
+            createdAt=started + timedelta(seconds=i // 3),
+            updatedAt=started + timedelta(seconds=i // 3),
+        )
+        for i in range(USERS)
+    ]
+    user_table = _FakeUsers(users, db_round_trip)
+    writes = _FakeWrites(db_round_trip)
+    prisma.models.User.prisma = lambda: user_table
+    prisma.models.Log.prisma = lambda: writes
+    prisma.models.Joke.prisma = lambda: writes
+
+    pool = project.jokePool.JokePool()
+    for i in range(JOKES):
+        pool._store(
+            SimpleNamespace(
+                id=f"joke-{i:06d}",
+                text=f"Benchmark joke {i} {rng.random():.6f}",
+                source="benchmark",
+                createdAt=started + timedelta(seconds=i),
+                updatedAt=started + timedelta(seconds=i),
+            )
+        )
+    project.jokePool.joke_pool = pool
+
+    endpoints = [
+        SimpleNamespace(
+            id=f"endpoint-{i}",
+            method=method,
+            path=path,
+            handlerId=handler_id,
+            rateLimit=10**9,
+            updatedAt=started,
+        )
+        for i, (method, path, handler_id) in enumerate(
+            [
+                ("GET", "/jokes/random", "fetchRandomJoke"),
+                ("GET", "/jokes/random/stored", "getRandomJoke"),
+                ("GET", "/users", "getAllUsers"),
+                ("GET", "/users/{userId}", "getUser"),
+                ("GET", "/rateLimit/check", "<current_function_id>"),
+            ]
+        )
+    ]
+    project.endpointConfig.endpoint_config.load(endpoints)
+    project.rateLimiter.rate_limiter = project.rateLimiter.TokenBucketLimiter()
+    project.userCache.user_cache = project.userCache.UserCache()
+
+    joke_counter = iter(range(10**12))
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(upstream_round_trip)
+        return httpx.Response(200, json={"joke": f"Upstream joke {next(joke_counter)}"})
+
+    if upstream_url:
+        project.jokeUpstream.LITELLM_JOKES_URL = upstream_url
+        project.upstreamClient.upstream_client = project.upstreamClient.UpstreamClient()
+    else:
+        project.upstreamClient.upstream_client = project.upstreamClient.UpstreamClient(
+            transport=httpx.MockTransport(upstream)
+        )
+
+
+def _scenarios(rng: random.Random) -> Dict[str, Callable[[], str]]:
+    user_ids = [f"user-{i:06d}" for i in range(USERS)]
+    return {
+        "GET /jokes/random": lambda: "/jokes/random",
+        "GET /jokes/random/stored?user_id": lambda: f"/jokes/random/stored?user_id={rng.choice(user_ids)}",
+        "GET /users": lambda: "/users?limit=50",
+        "GET /users/{userId}": lambda: f"/users/{rng.choice(user_ids)}",
+        "GET /rateLimit/check": lambda: f"/rateLimit/check?user_id={rng.choice(user_ids)}",
+    }
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(
+        len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1)
+    )
+    return sorted_values[index]
+
+
+async def _run(
+    client: httpx.AsyncClient, next_path, requests: int, concurrency: int
+) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            path = next_path()
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def _regressions(results: dict, baseline: dict, threshold: float) -> List[str]:
+    found = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - threshold):
+            found.append(
+                f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} r/s"
+            )
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if current[key] > previous[key] * (1 + threshold):
+                found.append(f"{name}: {key} {previous[key]} -> {current[key]}")
+    return found
+
+
+async def main(args) -> int:
+    _installFakes(args.db_ms / 1000, args.upstream_ms / 1000, args.upstream_url)
+    await project.accessLog.access_log.start()
+    await project.jokeWriter.joke_writer.start()
+    rng = random.Random(SEED)
+    results = {
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "db_ms": args.db_ms,
+            "upstream_ms": args.upstream_ms,
+            "upstream_url": args.upstream_url,
+        },
+        "scenarios": {},
+    }
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=project.server.app),
+            base_url="http://loadtest",
+        ) as client:
+            for name, next_path in _scenarios(rng).items():
+                await _run(client, next_path, min(args.requests, 200), args.concurrency)
+                results["scenarios"][name] = await _run(
+                    client, next_path, args.requests, args.concurrency
+                )
+    finally:
+        await project.jokeWriter.joke_writer.stop()
+        await project.accessLog.access_log.stop()
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = _regressions(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--db-ms", type=float, default=1.0)
+    parser.add_argument("--upstream-ms", type=float, default=50.0)
+    parser.add_argument("--upstream-url")
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark of the per-request cost of `RateLimitMiddleware`.
+
+Calls the middleware directly against a no-op ASGI app (no server, no database) and reports the added time per
+request for a literal route, a templated route, a route with no configured limit, and a rejected request. Exits
+non-zero if any overhead exceeds the budget.
+
+    python -m benchmarks.rateLimitMiddleware [--requests N] [--budget-us US]
+"""
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+import project.rateLimiter
+import project.rateLimitMiddleware
+
+
+async def _noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+def _scope(method: str, path: str, user_id: str, address: str) -> dict:
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"x-user-id", user_id.encode())],
+        "client": (address, 50000),
+    }
+
+
+async def _time(app, scopes, requests: int) -> float:
+    started = time.perf_counter()
+    for i in range(requests):
+        await app(scopes[i % len(scopes)], _receive, _send)
+    return (time.perf_counter() - started) / requests
+
+
+async def main(requests: int, budget_us: float) -> int:
+    project.rateLimiter.rate_limiter = project.rateLimiter.TokenBucketLimiter()
+    table = project.rateLimitMiddleware.RouteTable()
+    table.load(
+        SimpleNamespace(id=f"endpoint-{i}", method=method, path=path, rateLimit=limit)
+        for i, (method, path, limit) in enumerate(
+            [
+                ("GET", "/jokes/random", 10**9),
+                ("GET", "/jokes/{jokeId}", 10**9),
+                ("GET", "/users", 10**9),
+                ("GET", "/users/{userId}", 10**9),
+                ("PUT", "/users/{userId}", 10**9),
+                ("DELETE", "/users/{userId}", 10**9),
+                ("GET", "/users/{userId}/details", 10**9),
+                ("POST", "/rateLimit/limited", 0),
+            ]
+        )
+    )
+    middleware = project.rateLimitMiddleware.RateLimitMiddleware(_noop_app, table)
+    users = [(f"user-{i}", f"10.0.{i // 256}.{i % 256}") for i in range(1000)]
+    cases = {
+        "literal route": [_scope("GET", "/jokes/random", *u) for u in users],
+        "templated route": [_scope("GET", f"/users/{u[0]}/details", *u) for u in users],
+        "unlimited route": [_scope("GET", "/docs", *u) for u in users],
+        "rejected (429)": [_scope("POST", "/rateLimit/limited", *u) for u in users],
+    }
+    baseline = await _time(_noop_app, cases["literal route"], requests)
+    print(f"{'no-op app':<18} {baseline * 1e6:8.2f} us/request")
+    worst = 0.0
+    for name, scopes in cases.items():
+        overhead = await _time(middleware, scopes, requests) - baseline
+        worst = max(worst, overhead)
+        print(f"{name:<18} {overhead * 1e6:8.2f} us/request overhead")
+    if worst * 1e6 > budget_us:
+        print(f"FAIL: overhead above the {budget_us:.0f} us budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--budget-us", type=float, default=100.0)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.requests, args.budget_us)))
@@ -0,0 +1,89 @@
+"""
+Query-count benchmark for `getSystemRateLimits`.
+
+Fills the endpoint configuration cache with N synthetic endpoints, replaces `FunctionStatus.prisma()` with an
+in-memory table that counts `find_many` calls and sleeps a simulated round trip per query, and reports the number of
+queries and the latency for each N. Exits non-zero if the query count grows with N.
+
+    python -m benchmarks.systemRateLimitQueries [--sizes 10,100,1000] [--round-trip-ms MS]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import prisma.models
+import project.endpointConfig
+import project.getSystemRateLimits_service
+
+
+class _CountingFunctionStatuses:
+    def __init__(self, statuses, round_trip: float):
+        self.statuses = statuses
+        self.round_trip = round_trip
+        self.queries = 0
+
+    async def find_many(self, where=None, **kwargs):
+        self.queries += 1
+        await asyncio.sleep(self.round_trip)
+        ids = where["id"]
+        wanted = set(ids["in"]) if isinstance(ids, dict) else {ids}
+        return [status for status in self.statuses if status.id in wanted]
+
+
+async def main(sizes, round_trip: float) -> int:
+    now = datetime.now(timezone.utc)
+    query_counts = set()
+    for size in sizes:
+        endpoints = [
+            SimpleNamespace(
+                id=f"endpoint-{i}",
+                method="GET",
+                path=f"/bench/{i}",
+                handlerId=f"handler-{i}",
+                rateLimit=100,
+                updatedAt=now,
+            )
+            for i in range(size)
+        ]
+        statuses = [
+            SimpleNamespace(
+                id=f"handler-{i}",
+                details={"roleAffected": "API_User"} if i % 2 else None,
+            )
+            for i in range(size)
+        ]
+        project.endpointConfig.endpoint_config.load(endpoints)
+        table = _CountingFunctionStatuses(statuses, round_trip)
+        prisma.models.FunctionStatus.prisma = lambda: table
+        started = time.perf_counter()
+        response = await project.getSystemRateLimits_service.getSystemRateLimits(
+            project.getSystemRateLimits_service.SystemRateLimitRequest()
+        )
+        elapsed = time.perf_counter() - started
+        assert len(response.rateLimits) == size
+        query_counts.add(table.queries)
+        print(
+            f"{size:>6} endpoints {table.queries:>4} queries {elapsed * 1000:9.2f} ms"
+        )
+    if len(query_counts) != 1:
+        print("FAIL: query count depends on the number of endpoints")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--round-trip-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    raise SystemExit(
+        asyncio.run(
+            main(
+                [int(size) for size in args.sizes.split(",")],
+                args.round_trip_ms / 1000,
+            )
+        )
+    )
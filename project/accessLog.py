@@ -0,0 +1,48 @@
+import os
+from typing import List, Optional
+
+import prisma
+import prisma.models
+import prisma.types
+import project.batchWriter
+
+
+async def _writeLogs(batch: List[prisma.types.LogCreateWithoutRelationsInput]) -> int:
+    # Log.userId is a foreign key, and a single unknown caller would fail the whole create_many, so entries for
+    # users that do not exist are dropped with one lookup per batch, and reported as dropped rather than written.
+    user_ids = list({entry["userId"] for entry in batch})
+    users = await prisma.models.User.prisma().find_many(where={"id": {"in": user_ids}})
+    known_user_ids = {user.id for user in users}
+    rows = [entry for entry in batch if entry["userId"] in known_user_ids]
+    if rows:
+        await prisma.models.Log.prisma().create_many(data=rows)
+    return len(rows)
+
+
+access_log = project.batchWriter.BatchWriter(
+    name="access_log",
+    flush=_writeLogs,
+    max_batch=int(os.environ.get("ACCESS_LOG_MAX_BATCH", "500")),
+    flush_interval=float(os.environ.get("ACCESS_LOG_FLUSH_SECONDS", "1.0")),
+    max_queue=int(os.environ.get("ACCESS_LOG_MAX_QUEUE", "50000")),
+    overflow=os.environ.get("ACCESS_LOG_OVERFLOW", "drop_newest"),
+    block_timeout=float(os.environ.get("ACCESS_LOG_BLOCK_SECONDS", "0.05")),
+)
+
+
+async def recordAccess(user_id: str, endpoint_id: Optional[str], action: str) -> bool:
+    """
+    Queues one Log row for an API call. The row is written by the background flush of `access_log`, never inline
+    with the request.
+
+    Args:
+        user_id (str): The calling user.
+        endpoint_id (Optional[str]): The APIEndpoint that was called, if it is configured.
+        action (str): What the user did, e.g. "GET /jokes/random".
+
+    Returns:
+        bool: False if the entry was dropped because the queue was full.
+    """
+    return await access_log.put(
+        {"action": action, "userId": user_id, "aPIEndpointId": endpoint_id}
+    )
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import Dict, List
+
+import prisma
+import prisma.models
+import project.jokeDedup
+from prisma import Prisma
+
+logger = logging.getLogger(__name__)
+
+
+async def backfillJokeHashes(page_size: int = 1000) -> None:
+    """
+    One-off backfill of `Joke.contentHash` for rows stored before the column existed. Rows are visited oldest first
+    and one row is kept per normalized text, so that the unique index on `contentHash` can be satisfied: the row
+    that already holds the hash if there is one (jokes stored since the column was added are hashed on insert, and
+    may duplicate an older unhashed row), otherwise the oldest. Every other duplicate is deleted.
+
+    Args:
+        page_size (int): How many rows to read and update per batch.
+    """
+    kept: Dict[str, str] = {}
+    last = None
+    updated = 0
+    deleted = 0
+    while True:
+        # Page by keyset from the last row read rather than by Prisma cursor: that row may be a duplicate deleted
+        # below, and a cursor on a missing row returns nothing, ending the backfill early.
+        where = {}
+        if last is not None:
+            where = {
+                "OR": [
+                    {"createdAt": {"gt": last.createdAt}},
+                    {"createdAt": last.createdAt, "id": {"gt": last.id}},
+                ]
+            }
+        jokes = await prisma.models.Joke.prisma().find_many(
+            where=where,
+            order=[{"createdAt": "asc"}, {"id": "asc"}],
+            take=page_size,
+        )
+        content_hashes = [
+            project.jokeDedup.jokeContentHash(joke.text) for joke in jokes
+        ]
+        # Setting a hash that another row already holds would fail the whole batch on the unique index, so look up
+        # the holders of every hash about to be written; they are kept, and the unhashed row is the duplicate.
+        missing = {
+            content_hash
+            for joke, content_hash in zip(jokes, content_hashes)
+            if joke.contentHash != content_hash and content_hash not in kept
+        }
+        holders: Dict[str, str] = {}
+        if missing:
+            holders = {
+                holder.contentHash: holder.id
+                for holder in await prisma.models.Joke.prisma().find_many(
+                    where={"contentHash": {"in": list(missing)}}
+                )
+            }
+        duplicate_ids: List[str] = []
+        updates = []
+        for joke, content_hash in zip(jokes, content_hashes):
+            keeper = kept.setdefault(content_hash, holders.get(content_hash, joke.id))
+            if keeper != joke.id:
+                duplicate_ids.append(joke.id)
+            elif joke.contentHash != content_hash:
+                updates.append((joke.id, content_hash))
+        async with prisma.get_client().batch_() as batcher:
+            if duplicate_ids:
+                batcher.joke.delete_many(where={"id": {"in": duplicate_ids}})
+                deleted += len(duplicate_ids)
+            for joke_id, content_hash in updates:
+                batcher.joke.update(
+                    where={"id": joke_id}, data={"contentHash": content_hash}
+                )
+                updated += 1
+        if len(jokes) < page_size:
+            break
+        last = jokes[-1]
+    logger.info(
+        "Backfilled %d joke hashes and deleted %d duplicate jokes", updated, deleted
+    )
+
+
+async def main() -> None:
+    db_client = Prisma(auto_register=True)
+    await db_client.connect()
+    try:
+        await backfillJokeHashes()
+    finally:
+        await db_client.disconnect()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BatchWriterStats(BaseModel):
+    """
+    Counters for a write-behind queue: how much is waiting, how much was written and how much was lost.
+    """
+
+    name: str
+    overflow: str
+    queued: int
+    max_queue: int
+    submitted: int
+    written: int
+    dropped: int
+    blocked: int
+    failed: int
+    flushes: int
+
+
+class BatchWriter(Generic[T]):
+    """
+    Write-behind queue that takes items from the request path without waiting on the database. A background task
+    hands them to `flush` in batches of at most `max_batch`, whenever a full batch is waiting or `flush_interval`
+    seconds have passed, and once more on `stop` so nothing queued is lost on shutdown. `flush` may return how many
+    of the items it actually wrote; items it chose to skip are then counted as dropped rather than written.
+
+    The queue holds at most `max_queue` items. When it is full, `overflow` decides what happens: "drop_newest"
+    discards the new item, "drop_oldest" discards the oldest queued item to make room, and "block" makes `put` wait
+    up to `block_timeout` seconds for a flush to free space before discarding the new item. Every discarded item is
+    counted. A batch whose write raises is logged and counted as failed, not retried.
+    """
+
+    overflow_policies = ("drop_newest", "drop_oldest", "block")
+
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[List[T]], Awaitable[Optional[int]]],
+        max_batch: int = 100,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+        overflow: str = "drop_newest",
+        block_timeout: float = 1.0,
+    ):
+        if overflow not in self.overflow_policies:
+            raise ValueError(f"Unknown batch writer overflow policy: {overflow}")
+        self.name = name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.failed = 0
+        self.flushes = 0
+        self._flush = flush
+        self._items: Deque[T] = deque()
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, item: T) -> bool:
+        """
+        Queues an item for the next batch. Never blocks.
+
+        Args:
+            item (T): The item to write.
+
+        Returns:
+            bool: False if the queue was full and the item was dropped.
+        """
+        if len(self._items) >= self.max_queue:
+            self.dropped += 1
+            self._wakeup.set()
+            if self.overflow != "drop_oldest":
+                return False
+            self._items.popleft()
+        self._items.append(item)
+        self.submitted += 1
+        if len(self._items) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    async def put(self, item: T) -> bool:
+        """
+        Queues an item for the next batch. With the "block" overflow policy a full queue makes the caller wait for
+        space, up to `block_timeout` seconds; otherwise this is the same as `submit`.
+
+        Args:
+            item (T): The item to write.
+
+        Returns:
+            bool: False if the item was dropped.
+        """
+        if self.overflow == "block" and len(self._items) >= self.max_queue:
+            self.blocked += 1
+            self._wakeup.set()
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.block_timeout
+            while len(self._items) >= self.max_queue:
+                self._space.clear()
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._space.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+        return self.submit(item)
+
+    def _drain(self) -> List[T]:
+        batch_size = min(self.max_batch, len(self._items))
+        batch = [self._items.popleft() for _ in range(batch_size)]
+        self._space.set()
+        return batch
+
+    async def flush(self) -> None:
+        """
+        Writes everything currently queued, one batch at a time.
+        """
+        while self._items:
+            batch = self._drain()
+            try:
+                written = await self._flush(batch)
+                if written is None:
+                    written = len(batch)
+                self.written += written
+                self.dropped += len(batch) - written
+            except Exception:
+                self.failed += len(batch)
+                logger.exception("Batch writer %s failed to write a batch", self.name)
+            self.flushes += 1
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> BatchWriterStats:
+        return BatchWriterStats(
+            name=self.name,
+            overflow=self.overflow,
+            queued=len(self._items),
+            max_queue=self.max_queue,
+            submitted=self.submitted,
+            written=self.written,
+            dropped=self.dropped,
+            blocked=self.blocked,
+            failed=self.failed,
+            flushes=self.flushes,
+        )
+
+    async def start(self) -> None:
+        """
+        Starts the background flush task.
+        """
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops the background flush task and writes whatever is still queued.
+        """
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
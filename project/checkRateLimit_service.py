@@ -1,8 +1,7 @@
-import datetime
 from typing import Optional
 
-import prisma
-import prisma.models
+import project.endpointConfig
+import project.rateLimiter
 from pydantic import BaseModel
 
 
@@ -16,41 +15,37 @@ class RateLimitCheckResponse(BaseModel):
     error_message: Optional[str] = None
 
 
-async def checkRateLimit(user_id: str) -> RateLimitCheckResponse:
+async def checkRateLimit(caller: str) -> RateLimitCheckResponse:
     """
     This endpoint checks if the requesting user has exceeded their API request quota. It intercepts API requests,
-    checks the user's request count stored in a database against predefined limits, and returns whether the user
-    can proceed or not. If exceeded, it returns an error message; otherwise, it allows the request to be processed.
+    checks the user's request count against predefined limits, and returns whether the user can proceed or not. If
+    exceeded, it returns an error message; otherwise, it allows the request to be processed. Request counts are kept
+    by the in-process rate limiter and endpoint limits by the endpoint configuration cache, so no query is needed.
+    Limits are enforced and consumed by `RateLimitMiddleware` per client address; this check only peeks at the
+    remaining quota of the requesting client without spending any of it.
 
     Args:
-    user_id (str): The unique identifier of the user for whom the rate limit check is being made. Typically passed as
-    a header or extracted from session/token.
+    caller (str): The rate-limit key of the requesting user or client, from
+    `project.rateLimitMiddleware.rateLimitCaller`.
 
     Returns:
     RateLimitCheckResponse: This response model informs the client whether the user has exceeded the API request rate limit or not.
     """
-    api_endpoint = await prisma.models.APIEndpoint.prisma().find_first(
-        where={"handlerId": "<current_function_id>"}
+    api_endpoints = project.endpointConfig.endpoint_config.find_by_handler(
+        "<current_function_id>"
     )
-    if not api_endpoint:
+    if not api_endpoints:
         return RateLimitCheckResponse(
             exceeded=True,
             remaining_requests=0,
             error_message="API endpoint configuration not found.",
         )
-    today_start = datetime.datetime.now().replace(
-        hour=0, minute=0, second=0, microsecond=0
+    api_endpoint = api_endpoints[0]
+    decision = project.rateLimiter.rate_limiter.check(
+        caller, api_endpoint.id, api_endpoint.rateLimit, cost=0
     )
-    request_count = await prisma.models.Log.prisma().count(
-        where={
-            "userId": user_id,
-            "APIEndpoint": {"id": api_endpoint.id},
-            "createdAt": {"gte": today_start},
-        }
-    )
-    rate_limit_exceeded = request_count >= api_endpoint.rateLimit
     return RateLimitCheckResponse(
-        exceeded=rate_limit_exceeded,
-        remaining_requests=max(0, api_endpoint.rateLimit - request_count),
-        error_message="Rate limit exceeded." if rate_limit_exceeded else None,
+        exceeded=not decision.allowed,
+        remaining_requests=decision.remaining,
+        error_message=None if decision.allowed else "Rate limit exceeded.",
     )
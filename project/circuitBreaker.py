@@ -0,0 +1,200 @@
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the protected dependency while the circuit is open.
+    """
+
+    pass
+
+
+class CircuitBreakerStats(BaseModel):
+    """
+    Current state of a circuit breaker, the outcomes in its rolling window and how often it has changed state.
+    """
+
+    name: str
+    state: CircuitState
+    window_calls: int
+    window_failures: int
+    window_slow_calls: int
+    rejected: int
+    transitions: Dict[str, int]
+    last_transition_at: Optional[datetime] = None
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for an unreliable dependency. While CLOSED, the outcome and latency of every call is kept for
+    `window_seconds`; once at least `min_calls` are in the window and either the error rate or the rate of calls
+    slower than `slow_call_seconds` reaches its threshold, the circuit OPENs and calls are rejected immediately with
+    `CircuitOpenError`. After `open_seconds` the circuit goes HALF_OPEN and lets `half_open_max_calls` probe calls
+    through: if they all succeed quickly it CLOSEs again, otherwise it re-opens.
+
+    Every transition is logged and counted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 30.0,
+        min_calls: int = 10,
+        error_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 2.0,
+        slow_call_rate_threshold: float = 0.5,
+        open_seconds: float = 15.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CircuitState.CLOSED
+        self.rejected = 0
+        self.transitions: Dict[str, int] = {}
+        self.last_transition_at: Optional[datetime] = None
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque()
+        self._failures = 0
+        self._slow_calls = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+
+    def _transition(self, state: CircuitState) -> None:
+        previous = self.state
+        self.state = state
+        key = f"{previous.value}->{state.value}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        self.last_transition_at = datetime.now(timezone.utc)
+        logger.warning("Circuit %s: %s -> %s", self.name, previous.value, state.value)
+        if state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CircuitState.HALF_OPEN:
+            self._probes = 0
+            self._probe_successes = 0
+        else:
+            self._outcomes.clear()
+            self._failures = 0
+            self._slow_calls = 0
+
+    def _trim(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            _, failed, slow = self._outcomes.popleft()
+            self._failures -= failed
+            self._slow_calls -= slow
+
+    def allow(self) -> bool:
+        """
+        Decides whether a call may go through, moving from OPEN to HALF_OPEN once the open period has elapsed.
+
+        Returns:
+            bool: True if the caller should make the call and report it with `record`.
+        """
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self._transition(CircuitState.HALF_OPEN)
+        if self.state == CircuitState.HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                self.rejected += 1
+                return False
+            self._probes += 1
+        return True
+
+    def record(self, latency: float, failed: bool) -> None:
+        """
+        Reports the outcome of a call that `allow` let through.
+
+        Args:
+            latency (float): How long the call took, in seconds.
+            failed (bool): Whether the call raised.
+        """
+        slow = latency >= self.slow_call_seconds
+        if self.state == CircuitState.HALF_OPEN:
+            if failed or slow:
+                self._transition(CircuitState.OPEN)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_max_calls:
+                self._transition(CircuitState.CLOSED)
+            return
+        if self.state != CircuitState.CLOSED:
+            return
+        now = time.monotonic()
+        self._outcomes.append((now, failed, slow))
+        self._failures += failed
+        self._slow_calls += slow
+        self._trim(now)
+        calls = len(self._outcomes)
+        if calls >= self.min_calls and (
+            self._failures / calls >= self.error_rate_threshold
+            or self._slow_calls / calls >= self.slow_call_rate_threshold
+        ):
+            self._transition(CircuitState.OPEN)
+
+    def _release_probe(self) -> None:
+        if self.state == CircuitState.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs `fn` through the breaker.
+
+        Args:
+            fn (Callable[[], Awaitable[T]]): The protected call.
+
+        Returns:
+            T: The result of `fn`.
+
+        Raises:
+            CircuitOpenError: If the circuit is open and `fn` was not called.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open.")
+        started = time.perf_counter()
+        try:
+            result = await fn()
+        except Exception:
+            self.record(time.perf_counter() - started, failed=True)
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        self.record(time.perf_counter() - started, failed=False)
+        return result
+
+    def stats(self) -> CircuitBreakerStats:
+        self._trim(time.monotonic())
+        return CircuitBreakerStats(
+            name=self.name,
+            state=self.state,
+            window_calls=len(self._outcomes),
+            window_failures=self._failures,
+            window_slow_calls=self._slow_calls,
+            rejected=self.rejected,
+            transitions=dict(self.transitions),
+            last_transition_at=self.last_transition_at,
+        )
@@ -4,7 +4,7 @@ from enum import Enum
 import prisma
 import prisma.enums
 import prisma.models
-from bcrypt import gensalt, hashpw
+import project.passwordHasher
 from pydantic import BaseModel
 
 
@@ -39,7 +39,7 @@ async def createUser(
     name: str, email: str, password: str, role: prisma.enums.Role
 ) -> CreateUserResponse:
     """
-    This route allows the creation of a new user in the system. It accepts user details such as name, email, and password, then returns the created user object with a status code of 201.
+    This route allows the creation of a new user in the system. It accepts user details such as name, email, and password, then returns the created user object with a status code of 201. The password is hashed with bcrypt on a bounded worker pool, off the event loop.
 
     Args:
     name (str): Full name of the user.
@@ -50,12 +50,12 @@ async def createUser(
     Returns:
     CreateUserResponse: Response model for user creation. Includes the newly created user object and a status message.
     """
-    hashed_password = hashpw(password.encode("utf-8"), gensalt())
+    hashed_password = await project.passwordHasher.password_hasher.hash(password)
     prisma_user = await prisma.models.User.prisma().create(
         data={
             "username": name,
             "email": email,
-            "hashed_password": hashed_password.decode("utf-8"),
+            "passwordHash": hashed_password,
             "role": role,
         }
     )
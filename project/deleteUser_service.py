@@ -1,5 +1,6 @@
 import prisma
 import prisma.models
+import project.userCache
 from pydantic import BaseModel
 
 
@@ -24,6 +25,7 @@ async def deleteUser(userId: str) -> DeleteUserResponse:
     """
     try:
         user = await prisma.models.User.prisma().delete(where={"id": userId})
+        project.userCache.user_cache.invalidate(userId)
         if user:
             message = f"User with ID {userId} has been successfully deleted."
         else:
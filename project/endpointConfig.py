@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+import prisma
+import prisma.models
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointConfigStats(BaseModel):
+    """
+    Size, version and freshness of the in-process APIEndpoint configuration cache.
+    """
+
+    endpoints: int
+    version: int
+    loads: int
+    reload_interval_seconds: float
+    loaded_at: Optional[datetime]
+
+
+class EndpointConfigCache:
+    """
+    In-process copy of the APIEndpoint table, indexed by id, handlerId and path. It is loaded at startup and updated in
+    place by writes made through this process, each of which bumps `version`; consumers holding derived state (such
+    as the rate-limit route table) compare versions to know when to rebuild. With a non-zero `reload_interval` the
+    table is also polled, so writes made by other instances are picked up; a poll only reloads the rows when the
+    row count or the latest `updatedAt` has changed.
+    """
+
+    def __init__(self, reload_interval: float = 0):
+        self.reload_interval = reload_interval
+        self.version = 0
+        self.loads = 0
+        self.loaded_at: Optional[datetime] = None
+        self._by_id: Dict[str, prisma.models.APIEndpoint] = {}
+        self._by_handler: Dict[str, List[prisma.models.APIEndpoint]] = {}
+        self._by_path: Dict[str, List[prisma.models.APIEndpoint]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def load(self, endpoints: Iterable[prisma.models.APIEndpoint]) -> None:
+        """
+        Replaces the cached configuration.
+
+        Args:
+            endpoints (Iterable[prisma.models.APIEndpoint]): Every configured endpoint.
+        """
+        by_id: Dict[str, prisma.models.APIEndpoint] = {}
+        by_handler: Dict[str, List[prisma.models.APIEndpoint]] = {}
+        by_path: Dict[str, List[prisma.models.APIEndpoint]] = {}
+        for endpoint in endpoints:
+            by_id[endpoint.id] = endpoint
+            by_handler.setdefault(endpoint.handlerId, []).append(endpoint)
+            by_path.setdefault(endpoint.path, []).append(endpoint)
+        self._by_id = by_id
+        self._by_handler = by_handler
+        self._by_path = by_path
+        self.version += 1
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def update(self, endpoint: prisma.models.APIEndpoint) -> None:
+        """
+        Applies a write made through this process to the cache.
+
+        Args:
+            endpoint (prisma.models.APIEndpoint): The endpoint as stored after the write.
+        """
+        endpoints = dict(self._by_id)
+        endpoints[endpoint.id] = endpoint
+        self.load(endpoints.values())
+
+    def get(self, endpoint_id: str) -> Optional[prisma.models.APIEndpoint]:
+        return self._by_id.get(endpoint_id)
+
+    def find_by_handler(self, handler_id: str) -> List[prisma.models.APIEndpoint]:
+        return self._by_handler.get(handler_id, [])
+
+    def find_by_path(self, path: str) -> List[prisma.models.APIEndpoint]:
+        return self._by_path.get(path, [])
+
+    def all(self) -> List[prisma.models.APIEndpoint]:
+        return list(self._by_id.values())
+
+    async def reload(self, force: bool = True) -> None:
+        """
+        Reloads the cache from the APIEndpoint table.
+
+        Args:
+            force (bool): Reload even if the table does not appear to have changed.
+        """
+        if not force and self._by_id:
+            count = await prisma.models.APIEndpoint.prisma().count()
+            latest = await prisma.models.APIEndpoint.prisma().find_first(
+                order={"updatedAt": "desc"}
+            )
+            cached_latest = max(endpoint.updatedAt for endpoint in self._by_id.values())
+            if count == len(self._by_id) and (
+                latest is None or latest.updatedAt <= cached_latest
+            ):
+                return
+        endpoints = await prisma.models.APIEndpoint.prisma().find_many()
+        self.load(endpoints)
+        self.loads += 1
+        logger.info(
+            "Loaded %d API endpoints (config version %d)", len(endpoints), self.version
+        )
+
+    async def _reload_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload(force=False)
+            except Exception:
+                logger.exception("Reloading the API endpoint configuration failed")
+
+    def stats(self) -> EndpointConfigStats:
+        return EndpointConfigStats(
+            endpoints=len(self._by_id),
+            version=self.version,
+            loads=self.loads,
+            reload_interval_seconds=self.reload_interval,
+            loaded_at=self.loaded_at,
+        )
+
+    async def start(self) -> None:
+        """
+        Loads the cache and starts the periodic reload, if enabled.
+        """
+        await self.reload()
+        if self.reload_interval:
+            self._task = asyncio.create_task(self._reload_loop())
+
+    async def stop(self) -> None:
+        """
+        Stops the periodic reload.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+endpoint_config = EndpointConfigCache(
+    reload_interval=float(os.environ.get("ENDPOINT_CONFIG_RELOAD_SECONDS", "0")),
+)
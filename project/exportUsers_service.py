@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+import prisma
+import prisma.models
+import project.userPages
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_FIELDS = ["id", "username", "role", "createdAt", "updatedAt"]
+
+
+def _exportRow(user: prisma.models.User) -> list:
+    return [
+        user.id,
+        user.username,
+        str(user.role),
+        user.createdAt.isoformat(),
+        user.updatedAt.isoformat(),
+    ]
+
+
+async def _exportPages(format: str) -> AsyncIterator[bytes]:
+    if format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(EXPORT_FIELDS)
+        yield buffer.getvalue().encode()
+    async for users in project.userPages.iterUserPages():
+        if format == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(_exportRow(user) for user in users)
+            yield buffer.getvalue().encode()
+        else:
+            yield b"".join(
+                json.dumps(dict(zip(EXPORT_FIELDS, _exportRow(user)))).encode() + b"\n"
+                for user in users
+            )
+
+
+def exportUsers(format: str = "ndjson") -> AsyncIterator[bytes]:
+    """
+    Streams every user as CSV (with a header row) or NDJSON, reading the User table one keyset page at a time so the table is never materialized in memory. Passwords are never exported.
+
+    Args:
+        format (str): "csv" or "ndjson".
+
+    Returns:
+        AsyncIterator[bytes]: The export, one chunk per page of users.
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"Unsupported export format: {format}")
+    return _exportPages(format)
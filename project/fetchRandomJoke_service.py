@@ -1,4 +1,10 @@
+from typing import Optional
+
 import httpx
+import project.circuitBreaker
+import project.jokeBuffer
+import project.jokePool
+import project.jokeUpstream
 from pydantic import BaseModel
 
 
@@ -25,7 +31,7 @@ class GetRandomJokeResponse(BaseModel):
     """
 
     joke: str
-    error: Error
+    error: Optional[Error] = None
 
 
 async def fetchRandomJoke(request: GetRandomJokeRequest) -> GetRandomJokeResponse:
@@ -33,7 +39,12 @@ async def fetchRandomJoke(request: GetRandomJokeRequest) -> GetRandomJokeRespons
     This route retrieves a random joke. It uses the litellm API to generate a random joke, handling any exceptions
     or errors via the Error Handling Module. Upon success, it returns the joke in a JSON format with a status code
     of 200. If any error occurs, this triggers the Error Handling Module to log the error and return a structured
-    error response. This ensures a reliable user experience.
+    error response. This ensures a reliable user experience. Jokes are served from the prefetch buffer when it has
+    one ready; the upstream is only called directly when the buffer is empty, and concurrent callers then share a
+    single upstream request. If the upstream fails, or its circuit breaker is open, a joke from the local Joke table
+    is served instead and the error is only returned when no local joke is available. Every caller is served the
+    same way: jokes that are new from litellm cannot be guaranteed not to repeat, so no-repeat delivery for known
+    users is only offered by `getRandomJoke` (GET /jokes/random/stored), over the stored jokes.
 
     Args:
     request (GetRandomJokeRequest): This GET request does not require any input parameters since it is used to fetch
@@ -43,37 +54,28 @@ async def fetchRandomJoke(request: GetRandomJokeRequest) -> GetRandomJokeRespons
     GetRandomJokeResponse: This response model encapsulates the joke received from the litellm API or the error
                            response structured by the Error Handling Module.
     """
+    joke_text = project.jokeBuffer.joke_buffer.pop()
+    if joke_text is not None:
+        return GetRandomJokeResponse(joke=joke_text, error=None)
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get("https://api.litellm.com/jokes/random")
-            response.raise_for_status()
-            joke_data = response.json()
-            joke_text = joke_data.get("joke")
-            if joke_text:
-                return GetRandomJokeResponse(joke=joke_text, error=None)
-            else:
-                return GetRandomJokeResponse(
-                    joke="",
-                    error=Error(
-                        status_code=404, message="Joke not found in API response."
-                    ),
-                )
+        joke_text = await project.jokeUpstream.fetchSharedUpstreamJoke()
+        return GetRandomJokeResponse(joke=joke_text, error=None)
+    except project.circuitBreaker.CircuitOpenError as e:
+        error = Error(status_code=503, message=f"Joke API unavailable: {str(e)}")
     except httpx.RequestError as e:
-        return GetRandomJokeResponse(
-            joke="", error=Error(status_code=500, message=f"Network error: {str(e)}")
-        )
+        error = Error(status_code=500, message=f"Network error: {str(e)}")
     except httpx.HTTPStatusError as e:
-        return GetRandomJokeResponse(
-            joke="",
-            error=Error(
-                status_code=e.response.status_code,
-                message="Failed to fetch joke from API",
-            ),
+        error = Error(
+            status_code=e.response.status_code,
+            message="Failed to fetch joke from API",
         )
+    except ValueError as e:
+        error = Error(status_code=404, message=str(e))
     except Exception as e:
-        return GetRandomJokeResponse(
-            joke="",
-            error=Error(
-                status_code=500, message=f"An unexpected error occurred: {str(e)}"
-            ),
+        error = Error(
+            status_code=500, message=f"An unexpected error occurred: {str(e)}"
         )
+    fallback_joke = project.jokePool.joke_pool.pick()
+    if fallback_joke is not None:
+        return GetRandomJokeResponse(joke=fallback_joke.text, error=None)
+    return GetRandomJokeResponse(joke="", error=error)
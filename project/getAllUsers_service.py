@@ -1,18 +1,28 @@
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, List, Optional
 
 import prisma
 import prisma.enums
 import prisma.models
-from pydantic import BaseModel
+import project.userPages
+from pydantic import BaseModel, field_validator
 
 
 class GetUsersRequest(BaseModel):
     """
-    Request model for retrieving list of users. It doesn't require a body or query parameters since it's a straightforward GET request.
+    Request model for retrieving list of users. Users are returned in creation order, one page of at most `limit` users at a time; pass the `next_cursor` of a response as `cursor` to get the following page. With `stream` set, every user from `cursor` onwards is streamed as NDJSON instead, reading `limit` users per query.
     """
 
-    pass
+    limit: int = 100
+    cursor: Optional[str] = None
+    stream: bool = False
+
+    @field_validator("cursor")
+    @classmethod
+    def _checkCursor(cls, cursor: Optional[str]) -> Optional[str]:
+        if cursor is not None:
+            project.userPages.decodeCursor(cursor)
+        return cursor
 
 
 class User(BaseModel):
@@ -33,6 +43,17 @@ class GetUsersResponse(BaseModel):
     """
 
     users: List[User]
+    next_cursor: Optional[str] = None
+
+
+def _toUser(user: prisma.models.User) -> User:
+    return User(
+        id=user.id,
+        createdAt=user.createdAt,
+        updatedAt=user.updatedAt,
+        username=user.username,
+        role=user.role.name,
+    )
 
 
 async def getAllUsers(request: GetUsersRequest) -> GetUsersResponse:
@@ -40,21 +61,30 @@ async def getAllUsers(request: GetUsersRequest) -> GetUsersResponse:
     Retrieves a list of all users. This can be used by administrators to audit or manage users. The response includes an array of user objects.
 
     Args:
-        request (GetUsersRequest): Request model for retrieving list of users. It doesn't require a body or query parameters since it's a straightforward GET request.
+        request (GetUsersRequest): Request model for retrieving list of users, with the page size and cursor.
 
     Returns:
-        GetUsersResponse: Response model containing an array of users. Each user contains standard fields according to the User database model.
-    """
-    users_records = await prisma.models.User.prisma().find_many()
-    users = [
-        User(
-            id=user.id,
-            createdAt=user.createdAt,
-            updatedAt=user.updatedAt,
-            username=user.username,
-            role=user.role.name,
-        )
-        for user in users_records
-    ]
-    response = GetUsersResponse(users=users)
+        GetUsersResponse: Response model containing an array of users. Each user contains standard fields according to the User database model, plus the cursor of the next page.
+    """
+    users_records, next_cursor = await project.userPages.fetchUserPage(
+        request.limit, request.cursor
+    )
+    users = [_toUser(user) for user in users_records]
+    response = GetUsersResponse(users=users, next_cursor=next_cursor)
     return response
+
+
+async def streamAllUsers(request: GetUsersRequest) -> AsyncIterator[bytes]:
+    """
+    Streams every user from the request cursor onwards as NDJSON, one line per user and one chunk per page, so memory use does not grow with the number of users.
+
+    Args:
+        request (GetUsersRequest): Request model for retrieving list of users, with the page size and cursor.
+
+    Returns:
+        AsyncIterator[bytes]: NDJSON chunks, one per page of users.
+    """
+    async for users in project.userPages.iterUserPages(request.limit, request.cursor):
+        yield b"".join(
+            _toUser(user).model_dump_json().encode() + b"\n" for user in users
+        )
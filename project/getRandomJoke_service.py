@@ -1,22 +1,22 @@
-import random
 from datetime import datetime
+from typing import Optional
 
-import prisma
-import prisma.models
+import project.jokeDelivery
+import project.jokePool
 from pydantic import BaseModel
 
 
 class RandomJokeRequest(BaseModel):
     """
-    This model represents the details required to fetch a random joke. Since this is a GET request without any input parameters, no fields are necessary.
+    This model represents the details required to fetch a random joke. When the requesting user is known, jokes they have already been served are skipped until they have seen the whole pool.
     """
 
-    pass
+    user_id: Optional[str] = None
 
 
 class RandomJokeResponse(BaseModel):
     """
-    The response for the GET /jokes/random endpoint. It returns a joke object with a text and any additional metadata.
+    The response for the GET /jokes/random/stored endpoint. It returns a joke object with a text and any additional metadata.
     """
 
     text: str
@@ -26,18 +26,27 @@ class RandomJokeResponse(BaseModel):
     id: str
 
 
+def _selectSlot(request: RandomJokeRequest) -> int:
+    if request.user_id is not None:
+        slot = project.jokeDelivery.pickUnseenSlot(request.user_id)
+    else:
+        slot = project.jokePool.joke_pool.pick_slot()
+    if slot is None:
+        raise ValueError("No jokes available.")
+    return slot
+
+
 def getRandomJoke(request: RandomJokeRequest) -> RandomJokeResponse:
     """
-    Fetches a random joke using the underlying logic of the Randomization Logic Module, which selects a joke randomly from a dataset. This jokes then passes to the Joke Fetching Logic Module, ensuring that it reaches the user in a consumable format. The response will include a joke string in JSON format. Uses GET method to ensure simplicity and efficiency in fetching data.
+    Fetches a random joke using the underlying logic of the Randomization Logic Module, which selects a joke randomly from a dataset. This jokes then passes to the Joke Fetching Logic Module, ensuring that it reaches the user in a consumable format. The response will include a joke string in JSON format. Uses GET method to ensure simplicity and efficiency in fetching data. Jokes are drawn from the in-memory joke pool, so no database query is made per request. For a known user the joke comes from their no-repeat cursor over the pool, so nobody sees a joke twice before seeing them all.
 
     Args:
-    request (RandomJokeRequest): This model represents the details required to fetch a random joke. Since this is a GET request without any input parameters, no fields are necessary.
+    request (RandomJokeRequest): This model represents the details required to fetch a random joke, optionally for a known user.
 
     Returns:
-    RandomJokeResponse: The response for the GET /jokes/random endpoint. It returns a joke object with a text and any additional metadata.
+    RandomJokeResponse: The response for the GET /jokes/random/stored endpoint. It returns a joke object with a text and any additional metadata.
     """
-    jokes = prisma.models.Joke.prisma().find_many()
-    selected_joke = random.choice(jokes)
+    selected_joke = project.jokePool.joke_pool.at(_selectSlot(request))
     response = RandomJokeResponse(
         text=selected_joke.text,
         createdAt=selected_joke.createdAt,
@@ -46,3 +55,16 @@ def getRandomJoke(request: RandomJokeRequest) -> RandomJokeResponse:
         id=selected_joke.id,
     )
     return response
+
+
+def getRandomJokePayload(request: RandomJokeRequest) -> bytes:
+    """
+    Selects a random joke exactly like `getRandomJoke` but returns the joke pool's cached JSON encoding of the response instead of a model, for the fast response path.
+
+    Args:
+    request (RandomJokeRequest): This model represents the details required to fetch a random joke, optionally for a known user.
+
+    Returns:
+    bytes: The encoded RandomJokeResponse.
+    """
+    return project.jokePool.joke_pool.payload(_selectSlot(request))
@@ -0,0 +1,66 @@
+import os
+from typing import List
+
+import project.getRandomJoke_service
+import project.jokePool
+from pydantic import BaseModel
+
+MAX_JOKES_PER_REQUEST = int(os.environ.get("JOKE_BATCH_MAX_COUNT", "50"))
+
+
+class RandomJokesResponse(BaseModel):
+    """
+    The response for the GET /jokes/random/batch endpoint: distinct random jokes, each with its text and metadata.
+    """
+
+    requested: int
+    jokes: List[project.getRandomJoke_service.RandomJokeResponse]
+
+
+def _selectSlots(count: int) -> List[int]:
+    if count < 1:
+        raise ValueError("count must be at least 1.")
+    slots = project.jokePool.joke_pool.sample_slots(min(count, MAX_JOKES_PER_REQUEST))
+    if not slots:
+        raise ValueError("No jokes available.")
+    return slots
+
+
+def getRandomJokes(count: int) -> RandomJokesResponse:
+    """
+    Fetches several distinct random jokes in one request, for clients such as feeds and digests that would otherwise call GET /jokes/random repeatedly. Jokes are sampled without replacement from the in-memory joke pool, at a cost proportional to the number of jokes requested. At most MAX_JOKES_PER_REQUEST jokes are returned, and fewer if the pool is smaller.
+
+    Args:
+    count (int): How many jokes to return.
+
+    Returns:
+    RandomJokesResponse: The response for the GET /jokes/random/batch endpoint: distinct random jokes, each with its text and metadata.
+    """
+    pool = project.jokePool.joke_pool
+    selected_jokes = [pool.at(slot) for slot in _selectSlots(count)]
+    jokes = [
+        project.getRandomJoke_service.RandomJokeResponse(
+            text=joke.text,
+            createdAt=joke.createdAt,
+            updatedAt=joke.updatedAt,
+            source=joke.source,
+            id=joke.id,
+        )
+        for joke in selected_jokes
+    ]
+    return RandomJokesResponse(requested=count, jokes=jokes)
+
+
+def getRandomJokesPayload(count: int) -> bytes:
+    """
+    Samples jokes exactly like `getRandomJokes` but assembles the JSON response from the joke pool's cached encodings of each joke, so no joke is re-encoded, for the fast response path.
+
+    Args:
+    count (int): How many jokes to return.
+
+    Returns:
+    bytes: The encoded RandomJokesResponse.
+    """
+    pool = project.jokePool.joke_pool
+    jokes = b",".join(pool.payload(slot) for slot in _selectSlots(count))
+    return b'{"requested":%d,"jokes":[%b]}' % (count, jokes)
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import prisma
+from pydantic import BaseModel
+
+
+class EndpointUsage(BaseModel):
+    """
+    Number of requests a user made to one API endpoint.
+    """
+
+    aPIEndpointId: Optional[str] = None
+    path: Optional[str] = None
+    count: int
+
+
+class RateLimitUsageResponse(BaseModel):
+    """
+    Per-endpoint request counts for a user since the start of the reporting period.
+    """
+
+    user_id: str
+    since: datetime
+    total: int
+    endpoints: List[EndpointUsage]
+
+
+async def getRateLimitUsage(user_id: str, hours: int = 24) -> RateLimitUsageResponse:
+    """
+    Reports how many requests a user made to each API endpoint over the last `hours` hours, counted from the start of the hour. Closed hours are read from the hourly LogRollup table and only the Log rows that have not been rolled up yet are scanned, so the cost of this query does not grow with the age of the Log table.
+
+    Args:
+        user_id (str): The user whose usage is reported.
+        hours (int): The length of the reporting period in hours.
+
+    Returns:
+        RateLimitUsageResponse: Per-endpoint request counts for a user since the start of the reporting period.
+    """
+    if hours < 1:
+        raise ValueError("hours must be at least 1.")
+    since = datetime.now(timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    ) - timedelta(hours=hours - 1)
+    rows = await prisma.get_client().query_raw(
+        "WITH w AS (SELECT COALESCE(max(\"hour\") + interval '1 hour', $2::timestamp(3)) AS upto "
+        'FROM "LogRollup") '
+        'SELECT u."aPIEndpointId", e."path", sum(u."count")::integer AS "count" FROM ('
+        'SELECT NULLIF(r."aPIEndpointId", \'\') AS "aPIEndpointId", r."count" '
+        'FROM "LogRollup" r, w WHERE r."userId" = $1 AND r."hour" >= $2::timestamp(3) '
+        'AND r."hour" < w.upto '
+        'UNION ALL SELECT l."aPIEndpointId", 1 FROM "Log" l, w WHERE l."userId" = $1 '
+        'AND l."createdAt" >= GREATEST(w.upto, $2::timestamp(3))'
+        ') u LEFT JOIN "APIEndpoint" e ON e."id" = u."aPIEndpointId" '
+        'GROUP BY u."aPIEndpointId", e."path" ORDER BY "count" DESC',
+        user_id,
+        since.isoformat(),
+    )
+    endpoints = [EndpointUsage(**row) for row in rows]
+    return RateLimitUsageResponse(
+        user_id=user_id,
+        since=since,
+        total=sum(endpoint.count for endpoint in endpoints),
+        endpoints=endpoints,
+    )
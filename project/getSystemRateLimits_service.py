@@ -3,6 +3,7 @@ from typing import List
 import prisma
 import prisma.enums
 import prisma.models
+import project.endpointConfig
 from pydantic import BaseModel
 
 
@@ -37,7 +38,7 @@ async def getSystemRateLimits(
     request: SystemRateLimitRequest,
 ) -> SystemRateLimitResponse:
     """
-    This endpoint provides a view of the current system-wide rate limits. It could be used by system operators to monitor and manage the overall API usage policies. This route fetches and displays all rate limits from the database, ensuring that system administrators are updated with the latest configurations.
+    This endpoint provides a view of the current system-wide rate limits. It could be used by system operators to monitor and manage the overall API usage policies. This route fetches and displays all rate limits from the database, ensuring that system administrators are updated with the latest configurations. Endpoints come from the endpoint configuration cache and the role each limit affects is read from FunctionStatus in a single query, however many endpoints there are.
 
     Args:
         request (SystemRateLimitRequest): No specific request fields are necessary for retrieving system-wide rate limits, as this operation does not require input from the client side other than the necessary credentials and roles.
@@ -45,21 +46,18 @@ async def getSystemRateLimits(
     Returns:
         SystemRateLimitResponse: Response model to represent system-wide rate limits which include details such as request limits, time frame, and the particular API or functionality they apply to.
     """
-    endpoints = (
-        await prisma.models.APIEndpoint.find_many()
-    )  # TODO(autogpt): Cannot access member "find_many" for type "type[APIEndpoint]"
-    #     Member "find_many" is unknown. reportAttributeAccessIssue
+    endpoints = project.endpointConfig.endpoint_config.all()
+    handler_ids = list({endpoint.handlerId for endpoint in endpoints})
+    function_statuses = await prisma.models.FunctionStatus.prisma().find_many(
+        where={"id": {"in": handler_ids}}
+    )
+    roles_affected = {}
+    for status in function_statuses:
+        if isinstance(status.details, dict) and "roleAffected" in status.details:
+            roles_affected[status.id] = status.details["roleAffected"]
     rate_limits_details = []
     for endpoint in endpoints:
-        function_statuses = await prisma.models.FunctionStatus.find_many(
-            where={"id": endpoint.handlerId}
-        )  # TODO(autogpt): Cannot access member "find_many" for type "type[FunctionStatus]"
-        #     Member "find_many" is unknown. reportAttributeAccessIssue
-        role_affected = "System_Operator"
-        for status in function_statuses:
-            if hasattr(status, "details") and "roleAffected" in status.details:
-                role_affected = status.details["roleAffected"]
-                break
+        role_affected = roles_affected.get(endpoint.handlerId, "System_Operator")
         rate_limit_detail = RateLimitDetails(
             path=endpoint.path,
             limit=endpoint.rateLimit,
@@ -0,0 +1,63 @@
+import project.accessLog
+import project.batchWriter
+import project.circuitBreaker
+import project.endpointConfig
+import project.jokeBuffer
+import project.jokeDedup
+import project.jokeDelivery
+import project.jokeUpstream
+import project.jokeValidators
+import project.jokeWriter
+import project.logRollup
+import project.passwordHasher
+import project.rateLimiter
+import project.singleFlight
+import project.upstreamClient
+import project.userCache
+from pydantic import BaseModel
+
+
+class SystemStatsResponse(BaseModel):
+    """
+    Response model exposing the runtime counters of the in-process components that sit in front of the database and the litellm upstream.
+    """
+
+    jokeBuffer: project.jokeBuffer.JokeBufferStats
+    upstreamClient: project.upstreamClient.UpstreamClientStats
+    upstreamCoalescing: project.singleFlight.SingleFlightStats
+    upstreamCircuit: project.circuitBreaker.CircuitBreakerStats
+    jokeWriter: project.batchWriter.BatchWriterStats
+    jokeDedup: project.jokeDedup.JokeDeduplicatorStats
+    rateLimiter: project.rateLimiter.RateLimiterStats
+    accessLog: project.batchWriter.BatchWriterStats
+    logRollup: project.logRollup.LogCompactorStats
+    endpointConfig: project.endpointConfig.EndpointConfigStats
+    passwordHasher: project.passwordHasher.PasswordHasherStats
+    userCache: project.userCache.UserCacheStats
+    jokeDelivery: project.jokeDelivery.SeenJokeTrackerStats
+    jokeValidators: project.jokeValidators.JokeValidatorStats
+
+
+async def getSystemStats() -> SystemStatsResponse:
+    """
+    Reports the configuration and runtime counters of the in-process components, such as the upstream joke prefetch buffer and the shared upstream HTTP client. Everything is read from memory, so this endpoint never touches the database or the upstream.
+
+    Returns:
+        SystemStatsResponse: Response model exposing the runtime counters of the in-process components that sit in front of the database and the litellm upstream.
+    """
+    return SystemStatsResponse(
+        jokeBuffer=project.jokeBuffer.joke_buffer.stats(),
+        upstreamClient=project.upstreamClient.upstream_client.stats(),
+        upstreamCoalescing=project.jokeUpstream.upstream_flight.stats(),
+        upstreamCircuit=project.jokeUpstream.upstream_breaker.stats(),
+        jokeWriter=project.jokeWriter.joke_writer.stats(),
+        jokeDedup=project.jokeDedup.joke_dedup.stats(),
+        rateLimiter=project.rateLimiter.rate_limiter.stats(),
+        accessLog=project.accessLog.access_log.stats(),
+        logRollup=project.logRollup.log_compactor.stats(),
+        endpointConfig=project.endpointConfig.endpoint_config.stats(),
+        passwordHasher=project.passwordHasher.password_hasher.stats(),
+        userCache=project.userCache.user_cache.stats(),
+        jokeDelivery=project.jokeDelivery.seen_jokes.stats(),
+        jokeValidators=project.jokeValidators.joke_validators.stats(),
+    )
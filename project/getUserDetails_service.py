@@ -3,6 +3,7 @@ from datetime import datetime
 import prisma
 import prisma.enums
 import prisma.models
+import project.userCache
 from pydantic import BaseModel
 
 
@@ -20,7 +21,7 @@ class GetUserDetailsResponse(BaseModel):
 
 async def getUserDetails(userId: str) -> GetUserDetailsResponse:
     """
-    Retrieves detailed information about a specific user identified by userId. It fetches data from the user database. If the user exists, it returns the user's details; if not, it triggers the Error Handling Module to return an error indicating that the user was not found.
+    Retrieves detailed information about a specific user identified by userId. It fetches data from the user database through the shared user cache. If the user exists, it returns the user's details; if not, it triggers the Error Handling Module to return an error indicating that the user was not found.
 
     Args:
         userId (str): The unique identifier of the user for whom details are to be retrieved. It's passed in the path of the URL.
@@ -32,9 +33,7 @@ async def getUserDetails(userId: str) -> GetUserDetailsResponse:
         getUserDetails('123e4567-e89b-12d3-a456-426614174000')
         > GetUserDetailsResponse(id='123e4567-e89b-12d3-a456-426614174000', username='john_doe', createdAt=datetime.datetime.now(), updatedAt=datetime.datetime.now(), role=prisma.enums.Role.API_User)
     """
-    user = await prisma.models.User.prisma().find_unique(
-        where={"id": userId}, include={"role": True}
-    )
+    user = await project.userCache.user_cache.get(userId)
     if not user:
         raise ValueError(f"User with ID {userId} not found.")
     return GetUserDetailsResponse(
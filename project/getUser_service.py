@@ -4,6 +4,7 @@ from enum import Enum
 import prisma
 import prisma.enums
 import prisma.models
+import project.userCache
 from pydantic import BaseModel, ValidationError
 
 
@@ -27,7 +28,7 @@ class Role(Enum):
 
 async def getUser(userId: str) -> UserDetailsResponse:
     """
-    Fetches details of a specific user by their unique identifier (userId). The function returns a single user object.
+    Fetches details of a specific user by their unique identifier (userId). The function returns a single user object. Lookups go through the shared user cache.
 
     Args:
         userId (str): The unique identifier of the user to fetch.
@@ -38,7 +39,7 @@ async def getUser(userId: str) -> UserDetailsResponse:
     Raises:
         ValueError: If the user does not exist.
     """
-    user = await prisma.models.User.prisma().find_unique(where={"id": userId})
+    user = await project.userCache.user_cache.get(userId)
     if user is None:
         raise ValueError("User not found")
     try:
@@ -0,0 +1,236 @@
+import asyncio
+import codecs
+import csv
+import json
+import os
+from typing import Any, AsyncIterator, List, Set, Tuple
+
+import prisma
+import prisma.enums
+import prisma.models
+import project.passwordHasher
+from pydantic import BaseModel, Field, ValidationError
+
+IMPORT_CHUNK_SIZE = int(os.environ.get("USER_IMPORT_CHUNK_SIZE", "500"))
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportUserRow(BaseModel):
+    """
+    One user to import, with the same fields as a single user creation.
+    """
+
+    name: str = Field(min_length=1)
+    email: str = Field(pattern=r"^[^@\s]+@[^@\s]+$")
+    password: str = Field(min_length=1)
+    role: prisma.enums.Role = prisma.enums.Role.API_User
+
+
+class ImportRowError(BaseModel):
+    """
+    Why one input row was not imported. Rows are numbered from 1, not counting the CSV header.
+    """
+
+    row: int
+    error: str
+
+
+class ImportUsersResponse(BaseModel):
+    """
+    Outcome of a bulk import: how many rows were read, created, skipped because their username or email was
+    already taken, and rejected, and why each skipped or rejected row was not imported.
+    """
+
+    received: int = 0
+    created: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _ndjsonRecords(lines: AsyncIterator[str]) -> AsyncIterator[Any]:
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield f"Invalid JSON: {e}"
+            continue
+        yield record if isinstance(record, dict) else "Expected a JSON object."
+
+
+async def _csvRecords(lines: AsyncIterator[str]) -> AsyncIterator[Any]:
+    header = None
+    record_lines: List[str] = []
+    in_quotes = False
+    async for line in lines:
+        # A record only ends at a newline outside quotes, i.e. after an even number of quote characters.
+        record_lines.append(line)
+        in_quotes ^= line.count('"') % 2 == 1
+        if in_quotes:
+            continue
+        fields = next(csv.reader(record_lines), [])
+        record_lines = []
+        if not any(field.strip() for field in fields):
+            continue
+        if header is None:
+            header = [field.strip().lower() for field in fields]
+            continue
+        if len(fields) != len(header):
+            yield f"Expected {len(header)} fields, got {len(fields)}."
+            continue
+        yield dict(zip(header, fields))
+    if record_lines:
+        yield "Unterminated quoted field."
+
+
+class _Importer:
+    def __init__(self, response: ImportUsersResponse):
+        self.response = response
+        self.usernames: Set[str] = set()
+
+    def fail(self, row: int, error: str) -> None:
+        self.response.failed += 1
+        self.report(row, error)
+
+    def skip(self, row: int, error: str) -> None:
+        self.response.skipped += 1
+        self.report(row, error)
+
+    def report(self, row: int, error: str) -> None:
+        if len(self.response.errors) < MAX_REPORTED_ERRORS:
+            self.response.errors.append(ImportRowError(row=row, error=error))
+        else:
+            self.response.errors_truncated = True
+
+    def validate(self, batch: List[Tuple[int, Any]]) -> List[Tuple[int, ImportUserRow]]:
+        rows = []
+        for row_number, record in batch:
+            if isinstance(record, str):
+                self.fail(row_number, record)
+                continue
+            try:
+                row = ImportUserRow.model_validate(record)
+            except ValidationError as e:
+                self.fail(
+                    row_number,
+                    "; ".join(
+                        f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                        for error in e.errors()
+                    ),
+                )
+                continue
+            if row.name in self.usernames:
+                self.fail(row_number, f"Duplicate username {row.name!r} in import.")
+                continue
+            self.usernames.add(row.name)
+            rows.append((row_number, row))
+        return rows
+
+    async def hash(
+        self, rows: List[Tuple[int, ImportUserRow]]
+    ) -> List[Tuple[int, ImportUserRow, str]]:
+        hasher = project.passwordHasher.password_hasher
+        # Leave the hashing queue free for interactive requests: never have more than one hash per worker in flight.
+        slots = asyncio.Semaphore(hasher.workers)
+
+        async def hash_row(row: ImportUserRow) -> str:
+            async with slots:
+                return await hasher.hash(row.password)
+
+        hashes = await asyncio.gather(
+            *(hash_row(row) for _, row in rows), return_exceptions=True
+        )
+        hashed_rows = []
+        for (row_number, row), hashed in zip(rows, hashes):
+            if isinstance(hashed, BaseException):
+                self.fail(row_number, f"Password hashing failed: {hashed}")
+                continue
+            hashed_rows.append((row_number, row, hashed))
+        return hashed_rows
+
+    async def insert(self, rows: List[Tuple[int, ImportUserRow, str]]) -> None:
+        users = prisma.models.User.prisma()
+        try:
+            await users.create_many(
+                data=[
+                    {
+                        "username": row.name,
+                        "email": row.email,
+                        "passwordHash": hashed,
+                        "role": row.role,
+                    }
+                    for _, row, hashed in rows
+                ],
+                skip_duplicates=True,
+            )
+            # Rows that hit a unique username or email, including ones inserted concurrently, were skipped. A row
+            # was inserted by this import only if its username now carries the (salted, so unique) hash we wrote.
+            stored = await users.find_many(
+                where={"username": {"in": [row.name for _, row, _ in rows]}}
+            )
+        except Exception as e:
+            for row_number, _, _ in rows:
+                self.fail(row_number, f"Insert failed: {e}")
+            return
+        stored_hashes = {user.username: user.passwordHash for user in stored}
+        for row_number, row, hashed in rows:
+            if stored_hashes.get(row.name) == hashed:
+                self.response.created += 1
+            else:
+                self.skip(row_number, f"Username {row.name!r} or email already exists.")
+
+    async def chunk(self, batch: List[Tuple[int, Any]]) -> None:
+        rows = self.validate(batch)
+        hashed_rows = await self.hash(rows) if rows else []
+        if hashed_rows:
+            await self.insert(hashed_rows)
+
+
+async def importUsers(
+    chunks: AsyncIterator[bytes], format: str, chunk_size: int = IMPORT_CHUNK_SIZE
+) -> ImportUsersResponse:
+    """
+    Creates users in bulk from a streamed CSV (with a header row) or NDJSON body whose rows carry name, email, password and an optional role. The body is read and processed `chunk_size` rows at a time, so memory does not grow with the size of the import: each chunk is validated, its passwords are hashed in parallel on the password hashing pool, and its rows are inserted with a single create_many that skips rows whose username or email is already taken. Rows that fail validation, hashing or insertion, and skipped duplicates, are reported individually and do not stop the import.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The request body as it is received.
+        format (str): "csv" or "ndjson".
+        chunk_size (int): How many rows to validate, hash and insert together.
+
+    Returns:
+        ImportUsersResponse: Outcome of a bulk import: how many rows were read, created and rejected, and why each rejected row failed.
+    """
+    if format == "csv":
+        records = _csvRecords(_lines(chunks))
+    elif format == "ndjson":
+        records = _ndjsonRecords(_lines(chunks))
+    else:
+        raise ValueError(f"Unsupported import format: {format}")
+    response = ImportUsersResponse()
+    importer = _Importer(response)
+    batch: List[Tuple[int, Any]] = []
+    async for record in records:
+        response.received += 1
+        batch.append((response.received, record))
+        if len(batch) >= chunk_size:
+            await importer.chunk(batch)
+            batch = []
+    if batch:
+        await importer.chunk(batch)
+    return response
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Deque, List, Optional
+
+import project.circuitBreaker
+import project.jokeUpstream
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class JokeBufferStats(BaseModel):
+    """
+    Snapshot of the upstream joke prefetch buffer: its configuration, current fill level and hit/miss counters.
+    """
+
+    capacity: int
+    size: int
+    low_watermark: int
+    high_watermark: int
+    refill_concurrency: int
+    hits: int
+    misses: int
+    refills: int
+    refill_errors: int
+
+
+class JokeBuffer:
+    """
+    Ring buffer of jokes prefetched from the litellm upstream. Requests pop ready jokes from memory; whenever the
+    fill level drops to `low_watermark`, up to `refill_concurrency` background workers fetch new jokes until the
+    buffer holds `high_watermark` jokes again. A capacity of 0 disables the buffer.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 64,
+        low_watermark: int = 16,
+        high_watermark: int = 48,
+        refill_concurrency: int = 4,
+        retry_delay: float = 1.0,
+    ):
+        if capacity and not 0 <= low_watermark < high_watermark <= capacity:
+            raise ValueError(
+                "Joke buffer watermarks must satisfy 0 <= low < high <= capacity."
+            )
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.refill_concurrency = refill_concurrency
+        self.retry_delay = retry_delay
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_errors = 0
+        self._jokes: Deque[str] = deque(maxlen=capacity or None)
+        self._pending = 0
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return len(self._jokes)
+
+    def pop(self) -> Optional[str]:
+        """
+        Takes the oldest prefetched joke out of the buffer, waking the refill workers if the buffer ran low.
+
+        Returns:
+            Optional[str]: The joke text, or None if the buffer is disabled or empty.
+        """
+        if not self.capacity:
+            return None
+        try:
+            joke_text = self._jokes.popleft()
+            self.hits += 1
+        except IndexError:
+            joke_text = None
+            self.misses += 1
+        if len(self._jokes) <= self.low_watermark:
+            self._wakeup.set()
+        return joke_text
+
+    async def _refill_worker(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            if len(self._jokes) + self._pending >= self.high_watermark:
+                self._wakeup.clear()
+                continue
+            self._pending += 1
+            try:
+                joke_text = await project.jokeUpstream.fetchUpstreamJoke()
+            except project.circuitBreaker.CircuitOpenError:
+                await asyncio.sleep(self.retry_delay)
+                continue
+            except Exception as e:
+                self.refill_errors += 1
+                logger.warning("Joke buffer refill failed: %s", e)
+                await asyncio.sleep(self.retry_delay)
+                continue
+            finally:
+                self._pending -= 1
+            self._jokes.append(joke_text)
+            self.refills += 1
+
+    def stats(self) -> JokeBufferStats:
+        return JokeBufferStats(
+            capacity=self.capacity,
+            size=len(self._jokes),
+            low_watermark=self.low_watermark,
+            high_watermark=self.high_watermark,
+            refill_concurrency=self.refill_concurrency,
+            hits=self.hits,
+            misses=self.misses,
+            refills=self.refills,
+            refill_errors=self.refill_errors,
+        )
+
+    async def start(self) -> None:
+        """
+        Starts the refill workers and triggers the initial fill.
+        """
+        if not self.capacity:
+            return
+        self._tasks = [
+            asyncio.create_task(self._refill_worker())
+            for _ in range(self.refill_concurrency)
+        ]
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        """
+        Cancels the refill workers. Jokes still in the buffer are discarded.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+joke_buffer = JokeBuffer(
+    capacity=int(os.environ.get("JOKE_BUFFER_CAPACITY", "64")),
+    low_watermark=int(os.environ.get("JOKE_BUFFER_LOW_WATERMARK", "16")),
+    high_watermark=int(os.environ.get("JOKE_BUFFER_HIGH_WATERMARK", "48")),
+    refill_concurrency=int(os.environ.get("JOKE_BUFFER_REFILL_CONCURRENCY", "4")),
+    retry_delay=float(os.environ.get("JOKE_BUFFER_RETRY_SECONDS", "1.0")),
+)
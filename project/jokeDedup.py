@@ -0,0 +1,198 @@
+import hashlib
+import logging
+import math
+import os
+import re
+import sys
+import unicodedata
+from typing import Iterator, Set
+
+import prisma
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalizeJokeText(text: str) -> str:
+    """
+    Normalizes a joke for duplicate detection: Unicode compatibility forms are folded, case is ignored and every
+    run of punctuation or whitespace collapses to a single space.
+
+    Args:
+        text (str): The joke text.
+
+    Returns:
+        str: The normalized text.
+    """
+    folded = unicodedata.normalize("NFKC", text).casefold()
+    return _NON_WORD.sub(" ", folded).strip()
+
+
+def jokeContentHash(text: str) -> str:
+    """
+    Computes the value stored in `Joke.contentHash`: the hex SHA-256 of the normalized joke text.
+
+    Args:
+        text (str): The joke text.
+
+    Returns:
+        str: The content hash.
+    """
+    return hashlib.sha256(normalizeJokeText(text).encode("utf-8")).hexdigest()
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over content hashes, sized for `capacity` entries at a false-positive rate of
+    `fp_rate`. Bit positions are derived from the hash itself by double hashing.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.size = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes) -> Iterator[int]:
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, digest: bytes) -> None:
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(digest)
+        )
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._bits)
+
+
+class JokeDeduplicatorStats(BaseModel):
+    """
+    Configuration, size and hit count of the in-process duplicate joke index.
+    """
+
+    mode: str
+    entries: int
+    memory_bytes: int
+    capacity: int
+    fp_rate: float
+    duplicates_rejected: int
+
+
+class JokeDeduplicator:
+    """
+    In-process index of the content hashes already stored in the Joke table, used to reject duplicate jokes before
+    any database round trip. In "set" mode the index is exact; in "bloom" mode memory is fixed by `capacity` and
+    `fp_rate`, at the cost of occasionally rejecting a new joke as a duplicate. The unique index on
+    `Joke.contentHash` remains the source of truth.
+    """
+
+    def __init__(
+        self,
+        mode: str = "set",
+        capacity: int = 1_000_000,
+        fp_rate: float = 0.001,
+        page_size: int = 5000,
+    ):
+        if mode not in ("set", "bloom"):
+            raise ValueError(f"Unknown joke dedup mode: {mode}")
+        self.mode = mode
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.page_size = page_size
+        self.entries = 0
+        self.duplicates_rejected = 0
+        self._hashes: Set[bytes] = set()
+        self._bloom = BloomFilter(capacity, fp_rate) if mode == "bloom" else None
+
+    def _add(self, digest: bytes) -> None:
+        if self._bloom is not None:
+            self._bloom.add(digest)
+        else:
+            self._hashes.add(digest)
+        self.entries += 1
+
+    def _contains(self, digest: bytes) -> bool:
+        if self._bloom is not None:
+            return digest in self._bloom
+        return digest in self._hashes
+
+    def isDuplicate(self, content_hash: str) -> bool:
+        """
+        Reports whether a content hash is (probably, in bloom mode) already stored. Hashes are only recorded with
+        `add` once their joke has been written, so a joke whose write was dropped or failed can be stored later.
+
+        Args:
+            content_hash (str): A hash produced by `jokeContentHash`.
+
+        Returns:
+            bool: True if the joke is a duplicate and should not be stored.
+        """
+        if self._contains(bytes.fromhex(content_hash)):
+            self.duplicates_rejected += 1
+            return True
+        return False
+
+    def add(self, content_hash: str) -> None:
+        """
+        Records the content hash of a joke that is now stored in the Joke table.
+
+        Args:
+            content_hash (str): A hash produced by `jokeContentHash`.
+        """
+        digest = bytes.fromhex(content_hash)
+        if not self._contains(digest):
+            self._add(digest)
+
+    async def start(self) -> None:
+        """
+        Warms the index from the content hashes already in the Joke table, paging through the unique index.
+        """
+        last_hash = ""
+        try:
+            while True:
+                rows = await prisma.get_client().query_raw(
+                    'SELECT "contentHash" FROM "Joke" WHERE "contentHash" > $1 '
+                    'ORDER BY "contentHash" LIMIT $2',
+                    last_hash,
+                    self.page_size,
+                )
+                for row in rows:
+                    self._add(bytes.fromhex(row["contentHash"]))
+                if len(rows) < self.page_size:
+                    break
+                last_hash = rows[-1]["contentHash"]
+        except Exception:
+            logger.exception("Warming the joke dedup index failed")
+        logger.info("Joke dedup index warmed with %d hashes", self.entries)
+
+    def stats(self) -> JokeDeduplicatorStats:
+        if self._bloom is not None:
+            memory_bytes = self._bloom.memory_bytes()
+        else:
+            memory_bytes = sys.getsizeof(self._hashes) + len(
+                self._hashes
+            ) * sys.getsizeof(bytes(32))
+        return JokeDeduplicatorStats(
+            mode=self.mode,
+            entries=self.entries,
+            memory_bytes=memory_bytes,
+            capacity=self.capacity,
+            fp_rate=self.fp_rate,
+            duplicates_rejected=self.duplicates_rejected,
+        )
+
+
+joke_dedup = JokeDeduplicator(
+    mode=os.environ.get("JOKE_DEDUP_MODE", "set"),
+    capacity=int(os.environ.get("JOKE_DEDUP_CAPACITY", "1000000")),
+    fp_rate=float(os.environ.get("JOKE_DEDUP_FP_RATE", "0.001")),
+)
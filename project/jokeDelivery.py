@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import random
+import struct
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import project.jokePool
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+_SNAPSHOT_MAGIC = b"SEEN\x02"
+_POOL = struct.Struct("<I32s")
+_ENTRY = struct.Struct("<III")
+_ID_LENGTH = struct.Struct("<H")
+_MASK32 = 0xFFFFFFFF
+
+
+def _permute(index: int, size: int, seed: int) -> int:
+    """
+    Maps `index` to its position in a pseudo-random permutation of range(size) chosen by `seed`, in O(1) and
+    without materializing the permutation: a four-round Feistel network permutes the smallest even-bit-width
+    domain covering `size`, and values that land outside range(size) are fed through again (cycle walking).
+    """
+    bits = max(2, (size - 1).bit_length())
+    bits += bits & 1
+    half = bits // 2
+    mask = (1 << half) - 1
+    value = index
+    while True:
+        left, right = value >> half, value & mask
+        for round_number in range(4):
+            key = (seed ^ (round_number * 0x9E3779B9)) & _MASK32
+            mixed = ((right ^ key) * 0x45D9F3B) & _MASK32
+            left, right = right, left ^ ((mixed ^ (mixed >> 16)) & mask)
+        value = (left << half) | right
+        if value < size:
+            return value
+
+
+class SeenJokeTrackerStats(BaseModel):
+    """
+    Size and activity of the per-user no-repeat joke delivery state.
+    """
+
+    users: int
+    max_users: int
+    deliveries: int
+    cycles_completed: int
+    evictions: int
+    snapshots: int
+
+
+class SeenJokeTracker:
+    """
+    Remembers, per user, which jokes of the pool have already been delivered, so that a user sees every joke once
+    before any joke repeats. Rather than a set of seen ids, each user holds a cursor into their own pseudo-random
+    permutation of the pool's slots: a seed, the pool size when the cycle started and the position reached, packed
+    into a single integer. Picking the next unseen joke is O(1) and costs no database query. Jokes added to the pool
+    mid-cycle join the user's next cycle.
+
+    At most `max_users` users are tracked; the least recently served are evicted. The table is written to the
+    binary file `snapshot_path` (12 bytes per user plus the user id) and read back on startup. Cursors are slot
+    positions, so the snapshot also records the pool's size and fingerprint, and is discarded if the pool no longer
+    holds the same jokes in those slots (e.g. jokes were deleted, or the pool is a reservoir sample).
+    """
+
+    def __init__(
+        self,
+        max_users: int = 100000,
+        snapshot_path: str = "",
+        persist_interval: float = 60,
+    ):
+        self.max_users = max_users
+        self.snapshot_path = snapshot_path
+        self.persist_interval = persist_interval
+        self.deliveries = 0
+        self.cycles_completed = 0
+        self.evictions = 0
+        self.snapshots = 0
+        # user id -> seed << 64 | cycle size << 32 | position
+        self._cursors: "OrderedDict[str, int]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    def next_slot(self, user_id: str, pool_size: int) -> Optional[int]:
+        """
+        Advances a user's cursor and returns the pool slot to serve them.
+
+        Args:
+            user_id (str): The user being served.
+            pool_size (int): The current number of jokes in the pool.
+
+        Returns:
+            Optional[int]: A slot the user has not been served in the current cycle, or None if the pool is empty.
+        """
+        if not pool_size:
+            return None
+        cursor = self._cursors.get(user_id)
+        if cursor is None:
+            seed, size, position = random.getrandbits(32), pool_size, 0
+        else:
+            seed, size, position = (
+                cursor >> 64,
+                (cursor >> 32) & _MASK32,
+                cursor & _MASK32,
+            )
+            if position >= size or size > pool_size:
+                self.cycles_completed += 1
+                seed, size, position = random.getrandbits(32), pool_size, 0
+        slot = _permute(position, size, seed)
+        self._cursors[user_id] = (seed << 64) | (size << 32) | (position + 1)
+        self._cursors.move_to_end(user_id)
+        if len(self._cursors) > self.max_users:
+            self._cursors.popitem(last=False)
+            self.evictions += 1
+        self.deliveries += 1
+        return slot
+
+    def _write_snapshot(self, cursors: List[Tuple[str, int]], pool_size: int) -> None:
+        fingerprint = project.jokePool.joke_pool.fingerprint(pool_size)
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "wb") as snapshot_file:
+            snapshot_file.write(_SNAPSHOT_MAGIC)
+            snapshot_file.write(_POOL.pack(pool_size, fingerprint))
+            for user_id, cursor in cursors:
+                encoded_id = user_id.encode("utf-8")
+                snapshot_file.write(_ID_LENGTH.pack(len(encoded_id)))
+                snapshot_file.write(encoded_id)
+                snapshot_file.write(
+                    _ENTRY.pack(
+                        cursor >> 64, (cursor >> 32) & _MASK32, cursor & _MASK32
+                    )
+                )
+        os.replace(temp_path, self.snapshot_path)
+
+    async def persist(self) -> None:
+        """
+        Writes every tracked cursor to the snapshot file, least recently served first, off the event loop.
+        """
+        if not self.snapshot_path:
+            return
+        await asyncio.to_thread(
+            self._write_snapshot,
+            list(self._cursors.items()),
+            len(project.jokePool.joke_pool),
+        )
+        self.snapshots += 1
+
+    async def restore(self) -> None:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        with open(self.snapshot_path, "rb") as snapshot_file:
+            data = snapshot_file.read()
+        if not data.startswith(_SNAPSHOT_MAGIC):
+            return
+        pool_size, fingerprint = _POOL.unpack_from(data, len(_SNAPSHOT_MAGIC))
+        pool = project.jokePool.joke_pool
+        if len(pool) < pool_size or pool.fingerprint(pool_size) != fingerprint:
+            logger.info(
+                "Discarding joke delivery cursors: the joke pool has changed since they were saved"
+            )
+            return
+        offset = len(_SNAPSHOT_MAGIC) + _POOL.size
+        while offset < len(data):
+            (id_length,) = _ID_LENGTH.unpack_from(data, offset)
+            offset += _ID_LENGTH.size
+            user_id = data[offset : offset + id_length].decode("utf-8")
+            offset += id_length
+            seed, size, position = _ENTRY.unpack_from(data, offset)
+            offset += _ENTRY.size
+            self._cursors[user_id] = (seed << 64) | (size << 32) | position
+        logger.info("Restored joke delivery cursors for %d users", len(self._cursors))
+
+    async def _persist_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            try:
+                await self.persist()
+            except Exception:
+                logger.exception("Persisting joke delivery cursors failed")
+
+    def stats(self) -> SeenJokeTrackerStats:
+        return SeenJokeTrackerStats(
+            users=len(self._cursors),
+            max_users=self.max_users,
+            deliveries=self.deliveries,
+            cycles_completed=self.cycles_completed,
+            evictions=self.evictions,
+            snapshots=self.snapshots,
+        )
+
+    async def start(self) -> None:
+        """
+        Restores persisted cursors and starts the periodic persistence task.
+        """
+        try:
+            await self.restore()
+        except Exception:
+            logger.exception("Restoring joke delivery cursors failed")
+        if self.persist_interval > 0:
+            self._task = asyncio.create_task(self._persist_loop())
+
+    async def stop(self) -> None:
+        """
+        Stops the persistence task and persists the final state.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.persist()
+
+
+seen_jokes = SeenJokeTracker(
+    max_users=int(os.environ.get("JOKE_DELIVERY_MAX_USERS", "100000")),
+    snapshot_path=os.environ.get("JOKE_DELIVERY_SNAPSHOT_PATH", "seen_jokes.bin"),
+    persist_interval=float(os.environ.get("JOKE_DELIVERY_SNAPSHOT_SECONDS", "60")),
+)
+
+
+def pickUnseenSlot(user_id: str) -> Optional[int]:
+    """
+    Selects the pool slot of a joke that `user_id` has not been served since their current cycle through the pool
+    began, in O(1).
+
+    Args:
+        user_id (str): The user being served.
+
+    Returns:
+        Optional[int]: The selected slot, or None if the pool is empty.
+    """
+    return seen_jokes.next_slot(user_id, len(project.jokePool.joke_pool))
+
+
+def pickUnseenJoke(user_id: str) -> Optional[project.jokePool.PooledJoke]:
+    """
+    Selects a joke from the pool that `user_id` has not been served since their current cycle through the pool
+    began, in O(1).
+
+    Args:
+        user_id (str): The user being served.
+
+    Returns:
+        Optional[project.jokePool.PooledJoke]: The selected joke, or None if the pool is empty.
+    """
+    slot = pickUnseenSlot(user_id)
+    return project.jokePool.joke_pool.at(slot) if slot is not None else None
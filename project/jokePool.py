@@ -0,0 +1,292 @@
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import sys
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import prisma
+import prisma.models
+import project.fastJSON
+
+logger = logging.getLogger(__name__)
+
+
+class PooledJoke(NamedTuple):
+    """
+    A single joke as held by the joke pool, rebuilt from the pool's column arrays on selection.
+    """
+
+    id: str
+    text: str
+    source: str
+    createdAt: datetime
+    updatedAt: datetime
+
+
+class JokePool:
+    """
+    Process-local pool of jokes from the Joke table. Rows are stored column-wise (ids, texts, sources and
+    timestamps in parallel arrays) so that random selection is a single index lookup and the per-joke
+    overhead stays small. Each slot also caches its joke's encoded JSON once it has been served, so the
+    fast response path does not re-encode popular jokes.
+
+    The pool is loaded once at startup, in (`createdAt`, `id`) order so that slots are assigned the same way on
+    every start while no jokes are added or deleted, and then refreshed incrementally by `updatedAt`. When `max_size` is
+    set, the pool keeps a uniform random sample of at most `max_size` jokes (reservoir sampling) instead of
+    the whole table. Deleted rows are not detected by incremental refreshes.
+    """
+
+    def __init__(
+        self, max_size: int = 0, page_size: int = 1000, refresh_interval: float = 0
+    ):
+        self.max_size = max_size
+        self.page_size = page_size
+        self.refresh_interval = refresh_interval
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._sources: List[str] = []
+        self._created = array("d")
+        self._updated = array("d")
+        self._payloads: List[Optional[bytes]] = []
+        self._slots: Dict[str, int] = {}
+        self._seen = 0
+        self._counted_until: Tuple[float, str] = (float("-inf"), "")
+        self._watermark: Optional[datetime] = None
+        self._refresh_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _store(self, joke: prisma.models.Joke) -> None:
+        slot = self._slots.get(joke.id)
+        if slot is None:
+            order_key = (joke.createdAt.timestamp(), joke.id)
+            sampling = self.max_size and len(self._ids) >= self.max_size
+            if sampling and order_key <= self._counted_until:
+                # A row the reservoir did not keep is read again when it is updated, and the refresh watermark
+                # re-reads boundary rows; each row is counted and given a draw only once, when first read. The initial
+                # load reads rows in (createdAt, id) order and refreshes see new rows after older ones, so a row that
+                # does not sort past the last counted row has been counted already.
+                return
+            self._seen += 1
+            self._counted_until = max(self._counted_until, order_key)
+            if sampling:
+                slot = random.randrange(self._seen)
+                if slot >= self.max_size:
+                    return
+                del self._slots[self._ids[slot]]
+                self._ids[slot] = joke.id
+            else:
+                slot = len(self._ids)
+                self._ids.append(joke.id)
+                self._texts.append("")
+                self._sources.append("")
+                self._created.append(0.0)
+                self._updated.append(0.0)
+                self._payloads.append(None)
+            self._slots[joke.id] = slot
+        self._texts[slot] = joke.text
+        self._sources[slot] = sys.intern(joke.source)
+        self._created[slot] = joke.createdAt.timestamp()
+        self._updated[slot] = joke.updatedAt.timestamp()
+        self._payloads[slot] = None
+
+    def _joke_at(self, slot: int) -> PooledJoke:
+        return PooledJoke(
+            id=self._ids[slot],
+            text=self._texts[slot],
+            source=self._sources[slot],
+            createdAt=datetime.fromtimestamp(self._created[slot], tz=timezone.utc),
+            updatedAt=datetime.fromtimestamp(self._updated[slot], tz=timezone.utc),
+        )
+
+    def at(self, slot: int) -> PooledJoke:
+        """
+        Returns the joke held in a slot. Slots are stable: the pool only grows, and in reservoir mode a slot's joke
+        is replaced in place.
+
+        Args:
+            slot (int): An index in range(len(pool)).
+
+        Returns:
+            PooledJoke: The joke in that slot.
+        """
+        return self._joke_at(slot)
+
+    def payload(self, slot: int) -> bytes:
+        """
+        Returns the JSON encoding of the joke in a slot, in the shape of a GET /jokes/random/stored response (text,
+        createdAt, updatedAt, source, id). The encoding is computed on first use and kept until the joke changes.
+
+        Args:
+            slot (int): An index in range(len(pool)).
+
+        Returns:
+            bytes: The encoded joke.
+        """
+        payload = self._payloads[slot]
+        if payload is None:
+            joke = self._joke_at(slot)
+            payload = project.fastJSON.dumps(
+                {
+                    "text": joke.text,
+                    "createdAt": joke.createdAt,
+                    "updatedAt": joke.updatedAt,
+                    "source": joke.source,
+                    "id": joke.id,
+                }
+            )
+            self._payloads[slot] = payload
+        return payload
+
+    def updated_at(self, joke_id: str) -> Optional[float]:
+        """
+        Returns the pool's copy of a joke's `updatedAt` as a POSIX timestamp, or None if the joke is not pooled.
+        """
+        slot = self._slots.get(joke_id)
+        return self._updated[slot] if slot is not None else None
+
+    def fingerprint(self, size: int) -> bytes:
+        """
+        Identifies which joke is in each of the first `size` slots, so that state keyed by slot (such as the
+        no-repeat delivery cursors) can tell whether it still refers to the same jokes after a restart.
+
+        Args:
+            size (int): How many slots to cover, at most len(pool).
+
+        Returns:
+            bytes: The SHA-256 of the ids in those slots, in slot order.
+        """
+        return hashlib.sha256("\n".join(self._ids[:size]).encode("utf-8")).digest()
+
+    def pick_slot(self) -> Optional[int]:
+        """
+        Selects a slot uniformly at random in O(1).
+
+        Returns:
+            Optional[int]: The selected slot, or None if the pool is empty.
+        """
+        if not self._ids:
+            return None
+        return random.randrange(len(self._ids))
+
+    def pick(self) -> Optional[PooledJoke]:
+        """
+        Selects a joke uniformly at random from the pool in O(1).
+
+        Returns:
+            Optional[PooledJoke]: The selected joke, or None if the pool is empty.
+        """
+        slot = self.pick_slot()
+        return self._joke_at(slot) if slot is not None else None
+
+    def sample_slots(self, count: int) -> List[int]:
+        """
+        Selects up to `count` distinct slots uniformly at random, without replacement. Sampling draws indices from
+        a range rather than copying the pool, so the cost is O(count) and not O(pool size).
+
+        Args:
+            count (int): How many slots to select.
+
+        Returns:
+            List[int]: The selected slots; fewer than `count` if the pool is smaller.
+        """
+        return random.sample(range(len(self._ids)), min(count, len(self._ids)))
+
+    def sample(self, count: int) -> List[PooledJoke]:
+        """
+        Selects up to `count` distinct jokes uniformly at random, without replacement, in O(count).
+
+        Args:
+            count (int): How many jokes to select.
+
+        Returns:
+            List[PooledJoke]: The selected jokes; fewer than `count` if the pool is smaller.
+        """
+        return [self._joke_at(slot) for slot in self.sample_slots(count)]
+
+    async def refresh(self) -> int:
+        """
+        Loads every Joke row updated since the last refresh, paging through the table by (`updatedAt`, `id`)
+        so that no single query returns more than `page_size` rows. The first call loads the whole table, paging by
+        (`createdAt`, `id`) instead so that the slot order does not depend on when jokes were last updated.
+
+        Returns:
+            int: The number of rows read from the database.
+        """
+        async with self._refresh_lock:
+            initial = self._watermark is None
+            if initial:
+                where = {}
+                order = [{"createdAt": "asc"}, {"id": "asc"}]
+                # Rows updated while the initial load runs are at or past this watermark, so the next refresh
+                # picks them up.
+                latest = await prisma.models.Joke.prisma().find_first(
+                    order={"updatedAt": "desc"}
+                )
+                watermark = latest.updatedAt if latest is not None else None
+            else:
+                where = {"updatedAt": {"gte": self._watermark}}
+                order = [{"updatedAt": "asc"}, {"id": "asc"}]
+                watermark = self._watermark
+            cursor = None
+            loaded = 0
+            while True:
+                page_args = {"where": where, "order": order, "take": self.page_size}
+                if cursor is not None:
+                    page_args.update(cursor={"id": cursor}, skip=1)
+                rows = await prisma.models.Joke.prisma().find_many(**page_args)
+                for row in rows:
+                    self._store(row)
+                loaded += len(rows)
+                if rows:
+                    if not initial:
+                        watermark = rows[-1].updatedAt
+                    cursor = rows[-1].id
+                if len(rows) < self.page_size:
+                    self._watermark = watermark
+                    return loaded
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Joke pool refresh failed")
+
+    async def start(self) -> None:
+        """
+        Performs the initial load and, if a refresh interval is configured, starts the background refresh task.
+        """
+        try:
+            loaded = await self.refresh()
+            logger.info("Joke pool loaded %d jokes (%d kept)", loaded, len(self))
+        except Exception:
+            logger.exception("Initial joke pool load failed")
+        if self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """
+        Stops the background refresh task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+joke_pool = JokePool(
+    max_size=int(os.environ.get("JOKE_POOL_MAX_SIZE", "0")),
+    page_size=int(os.environ.get("JOKE_POOL_PAGE_SIZE", "1000")),
+    refresh_interval=float(os.environ.get("JOKE_POOL_REFRESH_SECONDS", "30")),
+)
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import time
+
+import httpx
+import project.circuitBreaker
+import project.jokeDedup
+import project.jokeWriter
+import project.metrics
+import project.singleFlight
+import project.upstreamClient
+
+LITELLM_JOKES_URL = os.environ.get(
+    "UPSTREAM_JOKES_URL", "https://api.litellm.com/jokes/random"
+)
+# The client's read timeout applies per read, so a body dripped a few bytes at a time never trips it; this bounds
+# the whole request instead.
+UPSTREAM_TOTAL_TIMEOUT_SECONDS = float(
+    os.environ.get("UPSTREAM_TOTAL_TIMEOUT_SECONDS", "8.0")
+)
+
+upstream_breaker = project.circuitBreaker.CircuitBreaker(
+    name="litellm",
+    window_seconds=float(os.environ.get("UPSTREAM_BREAKER_WINDOW_SECONDS", "30")),
+    min_calls=int(os.environ.get("UPSTREAM_BREAKER_MIN_CALLS", "10")),
+    error_rate_threshold=float(
+        os.environ.get("UPSTREAM_BREAKER_ERROR_RATE_THRESHOLD", "0.5")
+    ),
+    slow_call_seconds=float(
+        os.environ.get("UPSTREAM_BREAKER_SLOW_CALL_SECONDS", "2.0")
+    ),
+    slow_call_rate_threshold=float(
+        os.environ.get("UPSTREAM_BREAKER_SLOW_CALL_RATE_THRESHOLD", "0.5")
+    ),
+    open_seconds=float(os.environ.get("UPSTREAM_BREAKER_OPEN_SECONDS", "15")),
+    half_open_max_calls=int(os.environ.get("UPSTREAM_BREAKER_HALF_OPEN_CALLS", "1")),
+)
+
+upstream_flight = project.singleFlight.SingleFlight(
+    window=float(os.environ.get("UPSTREAM_COALESCE_WINDOW_SECONDS", "0"))
+)
+
+
+async def _requestJoke() -> str:
+    started = time.perf_counter()
+    try:
+        async with asyncio.timeout(UPSTREAM_TOTAL_TIMEOUT_SECONDS):
+            response = await project.upstreamClient.upstream_client.get(
+                LITELLM_JOKES_URL
+            )
+    except Exception as e:
+        project.metrics.upstream_latency.observe(
+            ("litellm", "error"), time.perf_counter() - started
+        )
+        if isinstance(e, TimeoutError):
+            raise httpx.ReadTimeout(
+                f"No complete response within {UPSTREAM_TOTAL_TIMEOUT_SECONDS}s."
+            ) from e
+        raise
+    project.metrics.upstream_latency.observe(
+        ("litellm", str(response.status_code)), time.perf_counter() - started
+    )
+    response.raise_for_status()
+    joke_text = response.json().get("joke")
+    if not joke_text:
+        raise ValueError("Joke not found in API response.")
+    return joke_text
+
+
+async def fetchUpstreamJoke() -> str:
+    """
+    Fetches a single joke from the litellm API through the shared upstream client, guarded by the upstream circuit
+    breaker. Every joke fetched that is not already known to the duplicate index is queued for write-behind
+    persistence into the Joke table.
+
+    Returns:
+        str: The text of the joke.
+
+    Raises:
+        project.circuitBreaker.CircuitOpenError: If the circuit is open and the upstream was not called.
+        httpx.RequestError: If the upstream could not be reached.
+        httpx.HTTPStatusError: If the upstream answered with an error status.
+        ValueError: If the upstream response did not contain a joke.
+    """
+    joke_text = await upstream_breaker.call(_requestJoke)
+    content_hash = project.jokeDedup.jokeContentHash(joke_text)
+    if not project.jokeDedup.joke_dedup.isDuplicate(content_hash):
+        project.jokeWriter.joke_writer.submit(
+            {
+                "text": joke_text,
+                "source": LITELLM_JOKES_URL,
+                "contentHash": content_hash,
+            }
+        )
+    return joke_text
+
+
+async def fetchSharedUpstreamJoke() -> str:
+    """
+    Fetches a joke like `fetchUpstreamJoke`, except that concurrent callers share a single in-flight upstream
+    request and all receive its joke. This bounds upstream QPS regardless of client concurrency.
+
+    Returns:
+        str: The text of the joke.
+    """
+    return await upstream_flight.do(LITELLM_JOKES_URL, fetchUpstreamJoke)
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import project.jokePool
+from pydantic import BaseModel
+
+JOKE_DETAILS_CACHE_CONTROL = os.environ.get(
+    "JOKE_DETAILS_CACHE_CONTROL", "public, max-age=60"
+)
+RANDOM_JOKE_CACHE_CONTROL = "no-store"
+
+
+def jokeETag(joke_id: str, updated_at: float) -> str:
+    """
+    Builds the strong ETag of a joke's representation. `updatedAt` changes on every write to the row, so (id,
+    `updatedAt`) identifies one version of the joke; timestamps are compared at the database's millisecond
+    precision, so the ETag is the same whether it is computed from a row or from the joke pool.
+
+    Args:
+        joke_id (str): The joke's id.
+        updated_at (float): The joke's `updatedAt` as a POSIX timestamp.
+
+    Returns:
+        str: The quoted ETag.
+    """
+    version = f"{joke_id}:{round(updated_at * 1000)}".encode("utf-8")
+    return f'"{hashlib.blake2b(version, digest_size=12).hexdigest()}"'
+
+
+def etagMatches(if_none_match: str, etag: str) -> bool:
+    """
+    Evaluates an If-None-Match header against the current ETag using the weak comparison RFC 9110 prescribes for
+    this header: "*" matches anything, and a W/ prefix on a listed tag is ignored.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cacheHeaders(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": JOKE_DETAILS_CACHE_CONTROL}
+
+
+class JokeValidatorStats(BaseModel):
+    """
+    Size and effectiveness of the in-memory joke ETag index.
+    """
+
+    size: int
+    max_size: int
+    ttl_seconds: float
+    pool_hits: int
+    hits: int
+    misses: int
+    not_modified: int
+
+
+class JokeValidatorIndex:
+    """
+    Answers "is this ETag still current?" for joke detail reads without a database query. Jokes held by the joke
+    pool are validated against the pool's copy of `updatedAt`; other jokes are validated against the versions seen
+    by recent detail reads, kept in a bounded LRU for `ttl` seconds. Both sources may lag the database by up to a
+    refresh interval or `ttl`, during which a client can be told its (just superseded) copy is still current.
+    """
+
+    def __init__(self, max_size: int = 100000, ttl: float = 30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.pool_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        # joke id -> (expiry on the monotonic clock, ETag)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, joke_id: str) -> Optional[str]:
+        """
+        Returns the current ETag of a joke if it is known in memory.
+
+        Args:
+            joke_id (str): The joke's id.
+
+        Returns:
+            Optional[str]: The ETag, or None if the joke's current version is not known without a query.
+        """
+        updated_at = project.jokePool.joke_pool.updated_at(joke_id)
+        if updated_at is not None:
+            self.pool_hits += 1
+            return jokeETag(joke_id, updated_at)
+        entry = self._entries.get(joke_id)
+        if entry is not None:
+            expires_at, etag = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(joke_id)
+                self.hits += 1
+                return etag
+            del self._entries[joke_id]
+        self.misses += 1
+        return None
+
+    def remember(self, joke_id: str, updated_at: datetime) -> str:
+        """
+        Records the version of a joke just read from the database.
+
+        Args:
+            joke_id (str): The joke's id.
+            updated_at (datetime): The row's `updatedAt`.
+
+        Returns:
+            str: The joke's ETag.
+        """
+        etag = jokeETag(joke_id, updated_at.timestamp())
+        self._entries[joke_id] = (time.monotonic() + self.ttl, etag)
+        self._entries.move_to_end(joke_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return etag
+
+    def check(self, joke_id: str, if_none_match: str) -> Optional[str]:
+        """
+        Checks a conditional request against the index.
+
+        Args:
+            joke_id (str): The requested joke's id.
+            if_none_match (str): The request's If-None-Match header.
+
+        Returns:
+            Optional[str]: The current ETag if the client's copy is current and a 304 can be sent, otherwise None.
+        """
+        etag = self.get(joke_id)
+        if etag is None or not etagMatches(if_none_match, etag):
+            return None
+        self.not_modified += 1
+        return etag
+
+    def stats(self) -> JokeValidatorStats:
+        return JokeValidatorStats(
+            size=len(self._entries),
+            max_size=self.max_size,
+            ttl_seconds=self.ttl,
+            pool_hits=self.pool_hits,
+            hits=self.hits,
+            misses=self.misses,
+            not_modified=self.not_modified,
+        )
+
+
+joke_validators = JokeValidatorIndex(
+    max_size=int(os.environ.get("JOKE_VALIDATOR_MAX_SIZE", "100000")),
+    ttl=float(os.environ.get("JOKE_VALIDATOR_TTL_SECONDS", "30")),
+)
@@ -0,0 +1,26 @@
+import os
+from typing import List
+
+import prisma
+import prisma.models
+import prisma.types
+import project.batchWriter
+import project.jokeDedup
+
+
+async def _writeJokes(
+    batch: List[prisma.types.JokeCreateWithoutRelationsInput],
+) -> None:
+    await prisma.models.Joke.prisma().create_many(data=batch, skip_duplicates=True)
+    # Only now are the hashes known to be stored; skipped rows were duplicates of stored jokes anyway.
+    for joke in batch:
+        project.jokeDedup.joke_dedup.add(joke["contentHash"])
+
+
+joke_writer = project.batchWriter.BatchWriter(
+    name="jokes",
+    flush=_writeJokes,
+    max_batch=int(os.environ.get("JOKE_WRITER_MAX_BATCH", "100")),
+    flush_interval=float(os.environ.get("JOKE_WRITER_FLUSH_SECONDS", "2.0")),
+    max_queue=int(os.environ.get("JOKE_WRITER_MAX_QUEUE", "10000")),
+)
@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+import prisma
+from prisma import Prisma
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+HOUR = timedelta(hours=1)
+
+
+def parseTimestamp(value: Any) -> datetime:
+    """
+    Reads a DateTime column returned by a raw query, which stores UTC without a time zone, as an aware datetime.
+
+    Args:
+        value (Any): The column value, either a datetime or an ISO 8601 string.
+
+    Returns:
+        datetime: The timestamp in UTC.
+    """
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _floorHour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+class LogCompactorStats(BaseModel):
+    """
+    Configuration and progress of the Log rollup and retention task.
+    """
+
+    interval_seconds: float
+    retention_hours: float
+    rollup_retention_days: float
+    rolled_up_until: Optional[datetime]
+    runs: int
+    failures: int
+    rollup_rows_written: int
+    log_rows_deleted: int
+    rollup_rows_deleted: int
+    last_run_seconds: float
+
+
+class LogCompactor:
+    """
+    Compacts the Log table into hourly LogRollup rows and enforces retention on both. Each run recomputes every
+    closed hour since the last rolled-up hour (re-running an hour replaces its counts, so runs are idempotent), then
+    deletes raw Log rows that are both older than `retention_hours` and already rolled up. Deletes stop at an hour
+    boundary, and never reach the hour the next run will recompute, so no hour's count is replaced by a partial one. Deletes are issued in
+    chunks of `delete_chunk` rows with a short pause in between, so no single statement holds locks on a large part
+    of the table. An hour is only considered closed `grace_seconds` after it ends, to leave time for the access log
+    writer to flush.
+    """
+
+    def __init__(
+        self,
+        interval: float = 300,
+        retention_hours: float = 72,
+        rollup_retention_days: float = 0,
+        grace_seconds: float = 120,
+        rollup_chunk_hours: int = 24,
+        delete_chunk: int = 5000,
+        delete_pause: float = 0.05,
+    ):
+        self.interval = interval
+        self.retention_hours = retention_hours
+        self.rollup_retention_days = rollup_retention_days
+        self.grace_seconds = grace_seconds
+        self.rollup_chunk_hours = rollup_chunk_hours
+        self.delete_chunk = delete_chunk
+        self.delete_pause = delete_pause
+        self.rolled_up_until: Optional[datetime] = None
+        self.runs = 0
+        self.failures = 0
+        self.rollup_rows_written = 0
+        self.log_rows_deleted = 0
+        self.rollup_rows_deleted = 0
+        self.last_run_seconds = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _rollupStart(self) -> Optional[datetime]:
+        rows = await prisma.get_client().query_raw(
+            'SELECT max("hour") AS "hour" FROM "LogRollup"'
+        )
+        if rows and rows[0]["hour"] is not None:
+            # The last rolled-up hour is recomputed in case rows for it were flushed after it was rolled up.
+            return parseTimestamp(rows[0]["hour"])
+        rows = await prisma.get_client().query_raw(
+            'SELECT min("createdAt") AS "createdAt" FROM "Log"'
+        )
+        if rows and rows[0]["createdAt"] is not None:
+            return _floorHour(parseTimestamp(rows[0]["createdAt"]))
+        return None
+
+    async def rollup(self) -> None:
+        """
+        Rolls up every closed hour of Log rows that has not been rolled up yet.
+        """
+        end = _floorHour(
+            datetime.now(timezone.utc) - timedelta(seconds=self.grace_seconds)
+        )
+        start = await self._rollupStart()
+        if start is None:
+            return
+        while start < end:
+            chunk_end = min(end, start + self.rollup_chunk_hours * HOUR)
+            self.rollup_rows_written += await prisma.get_client().execute_raw(
+                'INSERT INTO "LogRollup" ("userId", "aPIEndpointId", "hour", "count") '
+                'SELECT "userId", COALESCE("aPIEndpointId", \'\'), '
+                "date_trunc('hour', \"createdAt\"), count(*)::integer "
+                'FROM "Log" WHERE "createdAt" >= $1::timestamp(3) '
+                'AND "createdAt" < $2::timestamp(3) GROUP BY 1, 2, 3 '
+                'ON CONFLICT ("userId", "aPIEndpointId", "hour") '
+                'DO UPDATE SET "count" = EXCLUDED."count"',
+                start.isoformat(),
+                chunk_end.isoformat(),
+            )
+            start = chunk_end
+        self.rolled_up_until = max(start, end)
+
+    async def _deleteInChunks(self, table: str, column: str, cutoff: datetime) -> int:
+        deleted = 0
+        while True:
+            count = await prisma.get_client().execute_raw(
+                f'DELETE FROM "{table}" WHERE ctid IN (SELECT ctid FROM "{table}" '
+                f'WHERE "{column}" < $1::timestamp(3) LIMIT $2)',
+                cutoff.isoformat(),
+                self.delete_chunk,
+            )
+            deleted += count
+            if count < self.delete_chunk:
+                return deleted
+            await asyncio.sleep(self.delete_pause)
+
+    async def compact(self) -> None:
+        """
+        Deletes raw Log rows past retention that have been rolled up, and LogRollup rows past their own retention.
+        """
+        if self.rolled_up_until is None:
+            return
+        recompute_from = await self._rollupStart()
+        if recompute_from is None:
+            return
+        cutoff = min(
+            recompute_from,
+            self.rolled_up_until,
+            _floorHour(
+                datetime.now(timezone.utc) - timedelta(hours=self.retention_hours)
+            ),
+        )
+        self.log_rows_deleted += await self._deleteInChunks("Log", "createdAt", cutoff)
+        if self.rollup_retention_days:
+            self.rollup_rows_deleted += await self._deleteInChunks(
+                "LogRollup",
+                "hour",
+                datetime.now(timezone.utc) - timedelta(days=self.rollup_retention_days),
+            )
+
+    async def run(self) -> None:
+        """
+        Runs one rollup followed by one retention pass.
+        """
+        started = time.monotonic()
+        try:
+            await self.rollup()
+            await self.compact()
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.runs += 1
+            self.last_run_seconds = time.monotonic() - started
+
+    async def _run_loop(self) -> None:
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("Log rollup failed")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> LogCompactorStats:
+        return LogCompactorStats(
+            interval_seconds=self.interval,
+            retention_hours=self.retention_hours,
+            rollup_retention_days=self.rollup_retention_days,
+            rolled_up_until=self.rolled_up_until,
+            runs=self.runs,
+            failures=self.failures,
+            rollup_rows_written=self.rollup_rows_written,
+            log_rows_deleted=self.log_rows_deleted,
+            rollup_rows_deleted=self.rollup_rows_deleted,
+            last_run_seconds=self.last_run_seconds,
+        )
+
+    async def start(self) -> None:
+        """
+        Starts the periodic rollup task. A zero interval disables it.
+        """
+        if self.interval:
+            self._task = asyncio.create_task(self._run_loop())
+
+    async def stop(self) -> None:
+        """
+        Stops the periodic rollup task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+log_compactor = LogCompactor(
+    interval=float(os.environ.get("LOG_ROLLUP_INTERVAL_SECONDS", "300")),
+    retention_hours=float(os.environ.get("LOG_RETENTION_HOURS", "72")),
+    rollup_retention_days=float(os.environ.get("LOG_ROLLUP_RETENTION_DAYS", "0")),
+    grace_seconds=float(os.environ.get("LOG_ROLLUP_GRACE_SECONDS", "120")),
+    delete_chunk=int(os.environ.get("LOG_DELETE_CHUNK", "5000")),
+    delete_pause=float(os.environ.get("LOG_DELETE_PAUSE_SECONDS", "0.05")),
+)
+
+
+async def main() -> None:
+    db_client = Prisma(auto_register=True)
+    await db_client.connect()
+    try:
+        await log_compactor.run()
+        logger.info("%s", log_compactor.stats())
+    finally:
+        await db_client.disconnect()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from bcrypt import gensalt, hashpw
+from pydantic import BaseModel
+
+
+class PasswordHasherBusyError(RuntimeError):
+    """
+    Raised when the password hashing queue is full.
+    """
+
+
+class PasswordHasherStats(BaseModel):
+    """
+    Configuration, queue depth and latency of the bcrypt worker pool.
+    """
+
+    rounds: int
+    workers: int
+    max_queue: int
+    queued: int
+    active: int
+    hashed: int
+    rejected: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+    hash_seconds_total: float
+    hash_seconds_max: float
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated pool of `workers` threads (bcrypt releases the GIL while hashing), so a password hash
+    never blocks the event loop. At most `max_queue` hashes wait for a free worker; beyond that, `hash` fails fast
+    with `PasswordHasherBusyError` instead of letting latency grow without bound. `rounds` is the bcrypt cost factor.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 2, max_queue: int = 64):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self.hashed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+        self._pending = 0
+        # Updated from the worker threads, unlike the other counters, which only change on the event loop.
+        self._active = 0
+        self._active_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _hash(self, password: bytes, submitted: float) -> Tuple[str, float, float]:
+        started = time.monotonic()
+        with self._active_lock:
+            self._active += 1
+        try:
+            hashed = hashpw(password, gensalt(self.rounds)).decode("utf-8")
+        finally:
+            with self._active_lock:
+                self._active -= 1
+        return hashed, started - submitted, time.monotonic() - started
+
+    async def hash(self, password: str) -> str:
+        """
+        Hashes a password with bcrypt on the worker pool.
+
+        Args:
+            password (str): The plain-text password.
+
+        Returns:
+            str: The bcrypt hash.
+        """
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusyError("Password hashing queue is full.")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="bcrypt"
+            )
+        self._pending += 1
+        try:
+            hashed, waited, took = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._hash, password.encode("utf-8"), time.monotonic()
+            )
+        finally:
+            self._pending -= 1
+        self.hashed += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self.hash_seconds_total += took
+        self.hash_seconds_max = max(self.hash_seconds_max, took)
+        return hashed
+
+    def stats(self) -> PasswordHasherStats:
+        return PasswordHasherStats(
+            rounds=self.rounds,
+            workers=self.workers,
+            max_queue=self.max_queue,
+            queued=max(0, self._pending - self._active),
+            active=self._active,
+            hashed=self.hashed,
+            rejected=self.rejected,
+            wait_seconds_total=self.wait_seconds_total,
+            wait_seconds_max=self.wait_seconds_max,
+            hash_seconds_total=self.hash_seconds_total,
+            hash_seconds_max=self.hash_seconds_max,
+        )
+
+    async def stop(self) -> None:
+        """
+        Waits for in-flight hashes and shuts the worker pool down.
+        """
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True)
+
+
+password_hasher = PasswordHasher(
+    rounds=int(os.environ.get("BCRYPT_ROUNDS", "12")),
+    workers=int(os.environ.get("PASSWORD_HASH_WORKERS", "2")),
+    max_queue=int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", "64")),
+)
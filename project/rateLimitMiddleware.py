@@ -0,0 +1,219 @@
+import ipaddress
+import math
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Tuple
+from urllib.parse import parse_qs
+
+import prisma
+import prisma.models
+import project.accessLog
+import project.endpointConfig
+import project.rateLimiter
+
+_PATH_PARAM = re.compile(r"\{[^/{}]+\}")
+
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "").split(",")
+    if network.strip()
+]
+
+
+class RouteLimit(NamedTuple):
+    """
+    The APIEndpoint row whose rate limit applies to a route.
+    """
+
+    endpoint_id: str
+    limit: int
+
+
+class RouteTable:
+    """
+    In-memory index from (method, request path) to the matching APIEndpoint limit. Literal paths are resolved with
+    a single dict lookup; templated paths such as `/users/{userId}` are compiled to regular expressions and only
+    tried against requests with the same method and number of path segments. When built over an
+    `EndpointConfigCache`, the table rebuilds itself whenever the cache version changes.
+    """
+
+    def __init__(
+        self, source: Optional[project.endpointConfig.EndpointConfigCache] = None
+    ):
+        self.source = source
+        self.version = 0
+        self._exact: Dict[Tuple[str, str], RouteLimit] = {}
+        self._templates: Dict[Tuple[str, int], List[Tuple[Pattern, RouteLimit]]] = {}
+
+    def load(self, endpoints: Iterable[prisma.models.APIEndpoint]) -> None:
+        """
+        Replaces the table with the given endpoints.
+
+        Args:
+            endpoints (Iterable[prisma.models.APIEndpoint]): Every configured endpoint.
+        """
+        exact: Dict[Tuple[str, str], RouteLimit] = {}
+        templates: Dict[Tuple[str, int], List[Tuple[Pattern, RouteLimit]]] = {}
+        for endpoint in endpoints:
+            method = str(endpoint.method)
+            route_limit = RouteLimit(endpoint_id=endpoint.id, limit=endpoint.rateLimit)
+            if _PATH_PARAM.search(endpoint.path) is None:
+                exact[(method, endpoint.path)] = route_limit
+                continue
+            pattern = "".join(
+                "[^/]+" if _PATH_PARAM.fullmatch(part) else re.escape(part)
+                for part in re.split(r"(\{[^/{}]+\})", endpoint.path)
+            )
+            segments = endpoint.path.count("/")
+            templates.setdefault((method, segments), []).append(
+                (re.compile(pattern), route_limit)
+            )
+        self._exact = exact
+        self._templates = templates
+
+    def match(self, method: str, path: str) -> Optional[RouteLimit]:
+        """
+        Finds the limit for a request.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The request path.
+
+        Returns:
+            Optional[RouteLimit]: The matching endpoint limit, or None if the route is not rate limited.
+        """
+        if self.source is not None and self.source.version != self.version:
+            self.version = self.source.version
+            self.load(self.source.all())
+        route_limit = self._exact.get((method, path))
+        if route_limit is not None:
+            return route_limit
+        for pattern, route_limit in self._templates.get((method, path.count("/")), ()):
+            if pattern.fullmatch(path):
+                return route_limit
+        return None
+
+
+route_table = RouteTable(source=project.endpointConfig.endpoint_config)
+
+
+def _isTrustedProxy(address: str) -> bool:
+    try:
+        parsed = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(parsed in network for network in TRUSTED_PROXIES)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    values = [value.decode("latin-1") for key, value in scope["headers"] if key == name]
+    return ",".join(values) if values else None
+
+
+def rateLimitCaller(scope) -> str:
+    """
+    The key a request's rate limits are counted under. A request relayed by a proxy listed in
+    RATE_LIMIT_TRUSTED_PROXIES, which is trusted to authenticate callers and set `X-User-Id`, is counted against
+    that user; without the header, against the address the proxies forwarded for, read from `X-Forwarded-For` up to
+    the first hop that is not a trusted proxy. Every other request is counted against its peer address: user ids and
+    forwarded addresses sent by anyone else are ignored, since a client can send a different one with every request.
+
+    Args:
+        scope: The ASGI connection scope.
+
+    Returns:
+        str: "user:<id>", "ip:<address>", or "anonymous" when the server does not report the client.
+    """
+    client = scope.get("client")
+    if not client:
+        return "anonymous"
+    address = client[0]
+    if not TRUSTED_PROXIES or not _isTrustedProxy(address):
+        return f"ip:{address}"
+    user_id = _header(scope, b"x-user-id")
+    if user_id:
+        return f"user:{user_id}"
+    forwarded_for = _header(scope, b"x-forwarded-for")
+    if forwarded_for:
+        for hop in reversed(forwarded_for.split(",")):
+            address = hop.strip()
+            if not _isTrustedProxy(address):
+                break
+    return f"ip:{address}"
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware that enforces APIEndpoint rate limits on every route before its handler runs. Limits are counted
+    per authenticated user behind a trusted proxy, and per client address otherwise (see `rateLimitCaller`). Requests over the limit are answered with 429 and `Retry-After`;
+    every rate-limited response carries `X-RateLimit-Limit`, `X-RateLimit-Remaining` and `X-RateLimit-Reset`
+    (seconds until the limit fully resets). Every request that is let through and names a user, in the `X-User-Id`
+    header or else the `user_id` query parameter, is queued for the Log table via `project.accessLog`; unless it was
+    set by a trusted proxy, that claimed id is only used to attribute the request, never to decide whether it is
+    allowed.
+    """
+
+    def __init__(self, app, table: RouteTable = route_table):
+        self.app = app
+        self.table = table
+
+    @staticmethod
+    def _user_id(scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"x-user-id":
+                return value.decode("latin-1")
+        query_string = scope.get("query_string")
+        if query_string and b"user_id=" in query_string:
+            user_ids = parse_qs(query_string.decode("latin-1")).get("user_id")
+            if user_ids:
+                return user_ids[0]
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        user_id = self._user_id(scope)
+        route_limit = self.table.match(scope["method"], scope["path"])
+        if route_limit is None:
+            if user_id is not None:
+                await project.accessLog.recordAccess(
+                    user_id, None, f"{scope['method']} {scope['path']}"
+                )
+            await self.app(scope, receive, send)
+            return
+        decision = project.rateLimiter.rate_limiter.check(
+            rateLimitCaller(scope), route_limit.endpoint_id, route_limit.limit
+        )
+        rate_limit_headers = [
+            (b"x-ratelimit-limit", str(decision.limit).encode()),
+            (b"x-ratelimit-remaining", str(decision.remaining).encode()),
+            (b"x-ratelimit-reset", str(math.ceil(decision.reset_after)).encode()),
+        ]
+        if not decision.allowed:
+            body = b'{"error":"Rate limit exceeded."}'
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 429,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", str(math.ceil(decision.retry_after)).encode()),
+                        *rate_limit_headers,
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+        if user_id is not None:
+            await project.accessLog.recordAccess(
+                user_id, route_limit.endpoint_id, f"{scope['method']} {scope['path']}"
+            )
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *rate_limit_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,423 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import prisma
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitDecision(NamedTuple):
+    """
+    Outcome of a rate-limit check for one (user, endpoint) key.
+    """
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+    reset_after: float
+
+
+class RateLimiterStats(BaseModel):
+    """
+    Size and activity counters of the in-process rate limiter.
+    """
+
+    algorithm: str
+    window_seconds: float
+    keys: int
+    checks: int
+    rejections: int
+    evictions: int
+    snapshots: int
+
+
+class InMemoryRateLimiter(abc.ABC):
+    """
+    Base class for the in-process rate limiters. State is kept per (user id, endpoint id) key in an LRU-ordered
+    table; keys untouched for `idle_seconds` are evicted a few at a time as later checks pass by, so eviction never
+    costs more than O(1) per check. Subclasses persist their state every `persist_interval` seconds and on
+    shutdown, and restore it on startup.
+    """
+
+    algorithm = ""
+
+    def __init__(
+        self,
+        window_seconds: float = 86400,
+        idle_seconds: Optional[float] = None,
+        persist_interval: float = 60,
+        max_evictions_per_check: int = 8,
+    ):
+        self.window_seconds = window_seconds
+        self.idle_seconds = idle_seconds or window_seconds
+        self.persist_interval = persist_interval
+        self.max_evictions_per_check = max_evictions_per_check
+        self.checks = 0
+        self.rejections = 0
+        self.evictions = 0
+        self.snapshots = 0
+        self._entries: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    @abc.abstractmethod
+    def check(
+        self, user_id: str, endpoint_id: str, limit: int, cost: int = 1
+    ) -> RateLimitDecision:
+        """
+        Counts `cost` requests by `user_id` against `endpoint_id` if they fit within `limit`.
+
+        Args:
+            user_id (str): The caller.
+            endpoint_id (str): The APIEndpoint being called.
+            limit (int): The endpoint's rate limit per window.
+            cost (int): Requests to count; 0 only reports the current state.
+
+        Returns:
+            RateLimitDecision: Whether the request is allowed and how many requests remain.
+        """
+
+    @abc.abstractmethod
+    def _last_used(self, entry: Any) -> float:
+        """
+        Returns the wall-clock time (`time.time()`) at which a state entry was last touched, for idle eviction.
+        Limiter state is stamped with wall-clock time, not monotonic time, because it is persisted across restarts.
+        """
+
+    def _record(
+        self, key: Tuple[str, str], entry: Any, allowed: bool, now: float
+    ) -> None:
+        self.checks += 1
+        if not allowed:
+            self.rejections += 1
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        for _ in range(self.max_evictions_per_check):
+            oldest_key, oldest_entry = next(iter(self._entries.items()))
+            if now - self._last_used(oldest_entry) < self.idle_seconds:
+                return
+            del self._entries[oldest_key]
+            self.evictions += 1
+            if not self._entries:
+                return
+
+    async def persist(self) -> None:
+        pass
+
+    async def restore(self) -> None:
+        pass
+
+    async def _persist_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            try:
+                await self.persist()
+            except Exception:
+                logger.exception(
+                    "Persisting %s rate-limit state failed", self.algorithm
+                )
+
+    def stats(self) -> RateLimiterStats:
+        return RateLimiterStats(
+            algorithm=self.algorithm,
+            window_seconds=self.window_seconds,
+            keys=len(self._entries),
+            checks=self.checks,
+            rejections=self.rejections,
+            evictions=self.evictions,
+            snapshots=self.snapshots,
+        )
+
+    async def start(self) -> None:
+        """
+        Restores persisted state and starts the periodic persistence task.
+        """
+        try:
+            await self.restore()
+        except Exception:
+            logger.exception("Restoring %s rate-limit state failed", self.algorithm)
+        if self.persist_interval > 0:
+            self._task = asyncio.create_task(self._persist_loop())
+
+    async def stop(self) -> None:
+        """
+        Stops the persistence task and persists the final state.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.persist()
+
+
+class TokenBucketLimiter(InMemoryRateLimiter):
+    """
+    Token-bucket rate limiter. Each bucket holds up to `limit` tokens and refills continuously at
+    `limit / window_seconds` tokens per second, so a limit of N per window allows bursts of N and a sustained N per
+    window. A check is O(1): the bucket is brought up to date lazily when it is touched, and a full bucket is the
+    same as no bucket.
+
+    The table is written to the JSON file `snapshot_path` and read back on startup, so limits survive restarts.
+    """
+
+    algorithm = "token_bucket"
+
+    def __init__(self, snapshot_path: str = "", **kwargs: Any):
+        super().__init__(**kwargs)
+        self.snapshot_path = snapshot_path
+
+    def _last_used(self, entry: List[float]) -> float:
+        return entry[1]
+
+    def check(
+        self, user_id: str, endpoint_id: str, limit: int, cost: int = 1
+    ) -> RateLimitDecision:
+        now = time.time()
+        key = (user_id, endpoint_id)
+        rate = limit / self.window_seconds
+        bucket = self._entries.get(key)
+        if bucket is None:
+            tokens = float(limit)
+        else:
+            tokens = min(float(limit), bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= max(cost, 1)
+        if allowed:
+            tokens -= cost
+        if cost:
+            self._record(key, [tokens, now], allowed, now)
+        retry_after = 0.0 if allowed or not rate else (max(cost, 1) - tokens) / rate
+        reset_after = (limit - tokens) / rate if rate else 0.0
+        return RateLimitDecision(
+            allowed=allowed,
+            limit=limit,
+            remaining=int(tokens),
+            retry_after=retry_after,
+            reset_after=reset_after,
+        )
+
+    def _write_snapshot(self, buckets: List[list]) -> None:
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "w") as snapshot_file:
+            json.dump({"algorithm": self.algorithm, "buckets": buckets}, snapshot_file)
+        os.replace(temp_path, self.snapshot_path)
+
+    async def persist(self) -> None:
+        """
+        Writes every live bucket to the snapshot file, off the event loop.
+        """
+        if not self.snapshot_path:
+            return
+        buckets = [
+            [user_id, endpoint_id, tokens, updated_at]
+            for (user_id, endpoint_id), (tokens, updated_at) in self._entries.items()
+        ]
+        await asyncio.to_thread(self._write_snapshot, buckets)
+        self.snapshots += 1
+
+    async def restore(self) -> None:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        with open(self.snapshot_path) as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        if snapshot.get("algorithm") != self.algorithm:
+            return
+        for user_id, endpoint_id, tokens, updated_at in sorted(
+            snapshot["buckets"], key=lambda bucket: bucket[3]
+        ):
+            self._entries[(user_id, endpoint_id)] = [tokens, updated_at]
+        logger.info("Restored %d rate-limit buckets", len(self._entries))
+
+
+class _WindowCounts:
+    """
+    Request counts of one key in its most recent sub-buckets, as a ring indexed by sub-bucket number, together with
+    their running total.
+    """
+
+    __slots__ = ("counts", "bucket", "total")
+
+    def __init__(self, size: int, bucket: int):
+        self.counts = [0] * size
+        self.bucket = bucket
+        self.total = 0
+
+    def advance(self, bucket: int) -> None:
+        steps = min(bucket - self.bucket, len(self.counts))
+        for step in range(1, steps + 1):
+            slot = (self.bucket + step) % len(self.counts)
+            self.total -= self.counts[slot]
+            self.counts[slot] = 0
+        self.bucket = max(self.bucket, bucket)
+
+    def add(self, bucket: int, count: int) -> None:
+        if self.bucket - bucket >= len(self.counts):
+            return
+        self.advance(bucket)
+        self.counts[bucket % len(self.counts)] += count
+        self.total += count
+
+
+class SlidingWindowLimiter(InMemoryRateLimiter):
+    """
+    Sliding-window-counter rate limiter. The window is split into `sub_buckets` sub-buckets; the request count of
+    the window ending now is the sum of the sub-buckets it fully covers plus the overlapped fraction of the oldest
+    one, which is accurate to one sub-bucket (e.g. a minute for a one-hour window of 60 sub-buckets). Checks are
+    O(1) amortized and do not depend on log volume.
+
+    Increments are aggregated per (user, endpoint, sub-bucket) in memory and flushed to the RateLimitCounter table
+    in batched upserts; on startup the counters of the current window are read back.
+    """
+
+    algorithm = "sliding_window"
+
+    def __init__(self, sub_buckets: int = 24, flush_batch: int = 500, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.sub_buckets = sub_buckets
+        self.bucket_seconds = self.window_seconds / sub_buckets
+        self.flush_batch = flush_batch
+        self._pending: Dict[Tuple[str, str, int], int] = {}
+
+    def _last_used(self, entry: _WindowCounts) -> float:
+        return (entry.bucket + 1) * self.bucket_seconds
+
+    def check(
+        self, user_id: str, endpoint_id: str, limit: int, cost: int = 1
+    ) -> RateLimitDecision:
+        now = time.time()
+        key = (user_id, endpoint_id)
+        bucket = int(now // self.bucket_seconds)
+        elapsed = (now % self.bucket_seconds) / self.bucket_seconds
+        window = self._entries.get(key)
+        if window is None:
+            window = _WindowCounts(self.sub_buckets + 1, bucket)
+        window.advance(bucket)
+        oldest = window.counts[(bucket + 1) % len(window.counts)]
+        used = window.total - oldest * elapsed
+        allowed = used + max(cost, 1) <= limit
+        if allowed and cost:
+            window.add(bucket, cost)
+            pending_key = (user_id, endpoint_id, bucket)
+            self._pending[pending_key] = self._pending.get(pending_key, 0) + cost
+            used += cost
+        if cost:
+            self._record(key, window, allowed, now)
+        until_next_bucket = self.bucket_seconds - now % self.bucket_seconds
+        return RateLimitDecision(
+            allowed=allowed,
+            limit=limit,
+            remaining=max(0, int(limit - used)),
+            retry_after=0.0 if allowed else until_next_bucket,
+            reset_after=self.window_seconds - self.bucket_seconds + until_next_bucket,
+        )
+
+    def _bucket_start(self, bucket: int) -> str:
+        return datetime.fromtimestamp(
+            bucket * self.bucket_seconds, tz=timezone.utc
+        ).isoformat()
+
+    async def _upsert(self, rows: List[Tuple[Tuple[str, str, int], int]]) -> None:
+        values = []
+        params: List[Any] = []
+        for (user_id, endpoint_id, bucket), count in rows:
+            n = len(params)
+            values.append(
+                f"(${n + 1}, ${n + 2}, ${n + 3}::timestamp(3), ${n + 4}::integer)"
+            )
+            params.extend([user_id, endpoint_id, self._bucket_start(bucket), count])
+        await prisma.get_client().execute_raw(
+            'INSERT INTO "RateLimitCounter" ("userId", "aPIEndpointId", "bucketStart", "count") '
+            f"VALUES {', '.join(values)} "
+            'ON CONFLICT ("userId", "aPIEndpointId", "bucketStart") '
+            'DO UPDATE SET "count" = "RateLimitCounter"."count" + EXCLUDED."count"',
+            *params,
+        )
+
+    async def persist(self) -> None:
+        """
+        Flushes the aggregated increments since the last flush in batched upserts and prunes counters that have
+        left the window. Increments whose upsert fails are kept for the next flush.
+        """
+        pending, self._pending = self._pending, {}
+        rows = list(pending.items())
+        for start in range(0, len(rows), self.flush_batch):
+            try:
+                await self._upsert(rows[start : start + self.flush_batch])
+            except Exception:
+                for pending_key, count in rows[start:]:
+                    self._pending[pending_key] = (
+                        self._pending.get(pending_key, 0) + count
+                    )
+                raise
+        oldest_bucket = int(time.time() // self.bucket_seconds) - self.sub_buckets
+        await prisma.get_client().execute_raw(
+            'DELETE FROM "RateLimitCounter" WHERE "bucketStart" < $1::timestamp(3)',
+            self._bucket_start(oldest_bucket),
+        )
+        self.snapshots += 1
+
+    async def restore(self) -> None:
+        oldest_bucket = int(time.time() // self.bucket_seconds) - self.sub_buckets
+        rows = await prisma.get_client().query_raw(
+            'SELECT "userId", "aPIEndpointId", "bucketStart", "count" '
+            'FROM "RateLimitCounter" WHERE "bucketStart" >= $1::timestamp(3) '
+            'ORDER BY "bucketStart"',
+            self._bucket_start(oldest_bucket),
+        )
+        for row in rows:
+            bucket_start = row["bucketStart"]
+            if not isinstance(bucket_start, datetime):
+                bucket_start = datetime.fromisoformat(bucket_start)
+            if bucket_start.tzinfo is None:
+                bucket_start = bucket_start.replace(tzinfo=timezone.utc)
+            bucket = round(bucket_start.timestamp() / self.bucket_seconds)
+            key = (row["userId"], row["aPIEndpointId"])
+            window = self._entries.get(key)
+            if window is None:
+                window = self._entries[key] = _WindowCounts(
+                    self.sub_buckets + 1, bucket
+                )
+            window.add(bucket, row["count"])
+        logger.info("Restored rate-limit counters for %d keys", len(self._entries))
+
+
+def createRateLimiter() -> InMemoryRateLimiter:
+    """
+    Builds the rate limiter selected by `RATE_LIMIT_ALGORITHM` ("token_bucket" or "sliding_window").
+
+    Returns:
+        InMemoryRateLimiter: The configured rate limiter.
+    """
+    algorithm = os.environ.get("RATE_LIMIT_ALGORITHM", "token_bucket")
+    window_seconds = float(os.environ.get("RATE_LIMIT_WINDOW_SECONDS", "86400"))
+    idle_seconds = float(os.environ.get("RATE_LIMIT_IDLE_SECONDS", "0")) or None
+    if algorithm == TokenBucketLimiter.algorithm:
+        return TokenBucketLimiter(
+            snapshot_path=os.environ.get(
+                "RATE_LIMIT_SNAPSHOT_PATH", "rate_limits.json"
+            ),
+            window_seconds=window_seconds,
+            idle_seconds=idle_seconds,
+            persist_interval=float(os.environ.get("RATE_LIMIT_SNAPSHOT_SECONDS", "60")),
+        )
+    if algorithm == SlidingWindowLimiter.algorithm:
+        return SlidingWindowLimiter(
+            sub_buckets=int(os.environ.get("RATE_LIMIT_SUB_BUCKETS", "24")),
+            window_seconds=window_seconds,
+            idle_seconds=idle_seconds,
+            persist_interval=float(os.environ.get("RATE_LIMIT_FLUSH_SECONDS", "5")),
+        )
+    raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+
+
+rate_limiter = createRateLimiter()
@@ -4,43 +4,89 @@ from typing import Optional
 
 import prisma
 import prisma.enums
+import project.accessLog
 import project.checkRateLimit_service
 import project.createUser_service
 import project.deleteUser_service
+import project.endpointConfig
+import project.exportUsers_service
+import project.fastJSON
 import project.fetchJokeDetails_service
 import project.fetchRandomJoke_service
 import project.getAllUsers_service
 import project.getRandomJoke_service
+import project.getRandomJokes_service
+import project.getRateLimitUsage_service
 import project.getSystemRateLimits_service
+import project.getSystemStats_service
 import project.getUser_service
 import project.getUserDetails_service
+import project.importUsers_service
+import project.jokeBuffer
+import project.jokeDedup
+import project.jokeDelivery
+import project.jokePool
+import project.jokeValidators
+import project.jokeWriter
 import project.listUsers_service
+import project.logRollup
+import project.metrics
+import project.passwordHasher
+import project.rateLimiter
+import project.rateLimitMiddleware
 import project.setUserRateLimit_service
 import project.updateUser_service
 import project.updateUserDetails_service
-from fastapi import FastAPI
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import Response
-from prisma import Prisma
+import project.upstreamClient
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import Response, StreamingResponse
 
 logger = logging.getLogger(__name__)
 
-db_client = Prisma(auto_register=True)
+db_client = project.metrics.InstrumentedPrisma(auto_register=True)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await db_client.connect()
+    await project.endpointConfig.endpoint_config.start()
+    await project.rateLimiter.rate_limiter.start()
+    await project.accessLog.access_log.start()
+    await project.logRollup.log_compactor.start()
+    await project.jokePool.joke_pool.start()
+    await project.jokeDelivery.seen_jokes.start()
+    await project.jokeDedup.joke_dedup.start()
+    await project.jokeWriter.joke_writer.start()
+    await project.upstreamClient.upstream_client.open()
+    await project.jokeBuffer.joke_buffer.start()
     yield
+    await project.jokeBuffer.joke_buffer.stop()
+    await project.upstreamClient.upstream_client.close()
+    await project.jokeWriter.joke_writer.stop()
+    await project.jokeDelivery.seen_jokes.stop()
+    await project.jokePool.joke_pool.stop()
+    await project.logRollup.log_compactor.stop()
+    await project.accessLog.access_log.stop()
+    await project.rateLimiter.rate_limiter.stop()
+    await project.endpointConfig.endpoint_config.stop()
+    await project.passwordHasher.password_hasher.stop()
     await db_client.disconnect()
 
 
 app = FastAPI(
     title="joker203",
     lifespan=lifespan,
+    default_response_class=(
+        project.fastJSON.FastJSONResponse
+        if project.fastJSON.FAST_JSON_RESPONSES
+        else project.fastJSON.TimedJSONResponse
+    ),
     description="create a single api that returns one random joke using litellm",
 )
 
+app.add_middleware(project.rateLimitMiddleware.RateLimitMiddleware)
+app.add_middleware(project.metrics.MetricsMiddleware)
+
 
 @app.delete(
     "/users/{userId}", response_model=project.deleteUser_service.DeleteUserResponse
@@ -56,13 +102,65 @@ async def api_delete_deleteUser(
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
+        return project.fastJSON.errorResponse(e)
+
+
+@app.get(
+    "/jokes/random",
+    response_model=project.fetchRandomJoke_service.GetRandomJokeResponse,
+)
+async def api_get_fetchRandomJoke(
+    response: Response,
+) -> project.fetchRandomJoke_service.GetRandomJokeResponse | Response:
+    """
+    This route retrieves a random joke. It uses the litellm API to generate a random joke, handling any exceptions or errors via the Error Handling Module. Upon success, it returns the joke in a JSON format with a status code of 200. If any error occurs, this triggers the Error Handling Module to log the error and return a structured error response. This ensures a reliable user experience.
+    """
+    try:
+        request = project.fetchRandomJoke_service.GetRandomJokeRequest()
+        res = await project.fetchRandomJoke_service.fetchRandomJoke(request)
+        if project.fastJSON.FAST_JSON_RESPONSES:
+            return project.fastJSON.FastJSONResponse(
+                res,
+                headers={
+                    "Cache-Control": project.jokeValidators.RANDOM_JOKE_CACHE_CONTROL
+                },
+            )
+        response.headers["Cache-Control"] = (
+            project.jokeValidators.RANDOM_JOKE_CACHE_CONTROL
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        return project.fastJSON.errorResponse(e)
+
+
+@app.get(
+    "/jokes/random/batch",
+    response_model=project.getRandomJokes_service.RandomJokesResponse,
+)
+async def api_get_getRandomJokes(
+    response: Response,
+    count: int = 10,
+) -> project.getRandomJokes_service.RandomJokesResponse | Response:
+    """
+    Returns up to count distinct random jokes in one response, sampled without replacement from the joke pool.
+    """
+    try:
+        if project.fastJSON.FAST_JSON_RESPONSES:
+            return project.fastJSON.FastJSONResponse(
+                project.getRandomJokes_service.getRandomJokesPayload(count),
+                headers={
+                    "Cache-Control": project.jokeValidators.RANDOM_JOKE_CACHE_CONTROL
+                },
+            )
+        res = project.getRandomJokes_service.getRandomJokes(count)
+        response.headers["Cache-Control"] = (
+            project.jokeValidators.RANDOM_JOKE_CACHE_CONTROL
         )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        return project.fastJSON.errorResponse(e)
 
 
 @app.get(
@@ -70,89 +168,118 @@ async def api_delete_deleteUser(
     response_model=project.fetchJokeDetails_service.JokeDetailsResponse,
 )
 async def api_get_fetchJokeDetails(
-    jokeId: str,
+    jokeId: str, response: Response, if_none_match: Optional[str] = Header(None)
 ) -> project.fetchJokeDetails_service.JokeDetailsResponse | Response:
     """
-    Provides detailed information about a specific joke, identified by its 'jokeId'. This endpoint facilitates users in retrieving full details of a joke including its content, author, and publication date. The system fetches this information from the litellm platform and presents it in a structured format.
+    Provides detailed information about a specific joke, identified by its 'jokeId'. This endpoint facilitates users in retrieving full details of a joke including its content, author, and publication date. The system fetches this information from the litellm platform and presents it in a structured format. Responses carry a strong ETag; a request whose If-None-Match still matches is answered with 304, from memory when the joke's current version is known there.
     """
     try:
+        validators = project.jokeValidators.joke_validators
+        if if_none_match is not None:
+            etag = validators.check(jokeId, if_none_match)
+            if etag is not None:
+                return Response(
+                    status_code=304, headers=project.jokeValidators.cacheHeaders(etag)
+                )
         res = await project.fetchJokeDetails_service.fetchJokeDetails(jokeId)
+        etag = validators.remember(res.id, res.updatedAt)
+        if if_none_match is not None and project.jokeValidators.etagMatches(
+            if_none_match, etag
+        ):
+            return Response(
+                status_code=304, headers=project.jokeValidators.cacheHeaders(etag)
+            )
+        if project.fastJSON.FAST_JSON_RESPONSES:
+            return project.fastJSON.FastJSONResponse(
+                res, headers=project.jokeValidators.cacheHeaders(etag)
+            )
+        response.headers.update(project.jokeValidators.cacheHeaders(etag))
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
 
 
 @app.get("/users", response_model=project.getAllUsers_service.GetUsersResponse)
 async def api_get_getAllUsers(
-    request: project.getAllUsers_service.GetUsersRequest,
+    limit: int = 100, cursor: Optional[str] = None, stream: bool = False
 ) -> project.getAllUsers_service.GetUsersResponse | Response:
     """
     Retrieves a list of all users. This can be used by administrators to audit or manage users. The response includes an array of user objects.
     """
     try:
+        request = project.getAllUsers_service.GetUsersRequest(
+            limit=limit, cursor=cursor, stream=stream
+        )
+        if request.stream:
+            return StreamingResponse(
+                project.getAllUsers_service.streamAllUsers(request),
+                media_type="application/x-ndjson",
+            )
         res = await project.getAllUsers_service.getAllUsers(request)
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
 
 
 @app.get("/users", response_model=project.listUsers_service.GetUsersResponse)
 async def api_get_listUsers(
-    request: project.listUsers_service.GetUsersRequest,
+    limit: int = 100, cursor: Optional[str] = None, stream: bool = False
 ) -> project.listUsers_service.GetUsersResponse | Response:
     """
     Retrieves a list of all registered users. Useful for administrative purposes, this route provides an overview of users, enabling management functions such as auditing and monitoring.
     """
     try:
+        request = project.listUsers_service.GetUsersRequest(
+            limit=limit, cursor=cursor, stream=stream
+        )
+        if request.stream:
+            return StreamingResponse(
+                project.listUsers_service.streamUsers(request),
+                media_type="application/x-ndjson",
+            )
         res = await project.listUsers_service.listUsers(request)
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
+        return project.fastJSON.errorResponse(e)
+
+
+@app.get("/users/export")
+async def api_get_exportUsers(format: str = "ndjson") -> Response:
+    """
+    Streams every user as CSV or NDJSON, one keyset page at a time, for migrations and backups.
+    """
+    try:
+        chunks = project.exportUsers_service.exportUsers(format)
+        return StreamingResponse(
+            chunks,
+            media_type=project.exportUsers_service.EXPORT_MEDIA_TYPES[format],
         )
+    except Exception as e:
+        logger.exception("Error processing request")
+        return project.fastJSON.errorResponse(e)
 
 
-@app.get(
-    "/jokes/random",
-    response_model=project.fetchRandomJoke_service.GetRandomJokeResponse,
+@app.post(
+    "/users/import", response_model=project.importUsers_service.ImportUsersResponse
 )
-async def api_get_fetchRandomJoke(
-    request: project.fetchRandomJoke_service.GetRandomJokeRequest,
-) -> project.fetchRandomJoke_service.GetRandomJokeResponse | Response:
+async def api_post_importUsers(
+    request: Request, format: Optional[str] = None
+) -> project.importUsers_service.ImportUsersResponse | Response:
     """
-    This route retrieves a random joke. It uses the litellm API to generate a random joke, handling any exceptions or errors via the Error Handling Module. Upon success, it returns the joke in a JSON format with a status code of 200. If any error occurs, this triggers the Error Handling Module to log the error and return a structured error response. This ensures a reliable user experience.
+    Creates users in bulk from a streamed CSV or NDJSON body, chosen by the format parameter or else the Content-Type header, and reports the rows that could not be imported.
     """
     try:
-        res = await project.fetchRandomJoke_service.fetchRandomJoke(request)
+        if format is None:
+            content_type = request.headers.get("content-type", "")
+            format = "csv" if content_type.startswith("text/csv") else "ndjson"
+        res = await project.importUsers_service.importUsers(request.stream(), format)
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
 
 
 @app.get("/users/{userId}", response_model=project.getUser_service.UserDetailsResponse)
@@ -167,13 +294,7 @@ async def api_get_getUser(
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
 
 
 @app.post("/users", response_model=project.createUser_service.CreateUserResponse)
@@ -188,36 +309,40 @@ async def api_post_createUser(
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
 
 
 @app.get(
-    "/jokes/random", response_model=project.getRandomJoke_service.RandomJokeResponse
+    "/jokes/random/stored",
+    response_model=project.getRandomJoke_service.RandomJokeResponse,
 )
 async def api_get_getRandomJoke(
-    request: project.getRandomJoke_service.RandomJokeRequest,
+    response: Response,
+    user_id: Optional[str] = None,
+    x_user_id: Optional[str] = Header(None),
 ) -> project.getRandomJoke_service.RandomJokeResponse | Response:
     """
-    Fetches a random joke using the underlying logic of the Randomization Logic Module, which selects a joke randomly from a dataset. This jokes then passes to the Joke Fetching Logic Module, ensuring that it reaches the user in a consumable format. The response will include a joke string in JSON format. Uses GET method to ensure simplicity and efficiency in fetching data.
+    Fetches a random joke using the underlying logic of the Randomization Logic Module, which selects a joke randomly from a dataset. This jokes then passes to the Joke Fetching Logic Module, ensuring that it reaches the user in a consumable format. The response will include a joke string in JSON format. Uses GET method to ensure simplicity and efficiency in fetching data. Unlike GET /jokes/random, which asks litellm for a new joke, this serves stored jokes only, and never repeats a joke for a user (user_id or X-User-Id) until they have seen them all.
     """
     try:
+        request = project.getRandomJoke_service.RandomJokeRequest(
+            user_id=user_id or x_user_id
+        )
+        if project.fastJSON.FAST_JSON_RESPONSES:
+            return project.fastJSON.FastJSONResponse(
+                project.getRandomJoke_service.getRandomJokePayload(request),
+                headers={
+                    "Cache-Control": project.jokeValidators.RANDOM_JOKE_CACHE_CONTROL
+                },
+            )
         res = project.getRandomJoke_service.getRandomJoke(request)
+        response.headers["Cache-Control"] = (
+            project.jokeValidators.RANDOM_JOKE_CACHE_CONTROL
+        )
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
 
 
 @app.get(
@@ -225,23 +350,37 @@ async def api_get_getRandomJoke(
     response_model=project.checkRateLimit_service.RateLimitCheckResponse,
 )
 async def api_get_checkRateLimit(
-    user_id: str,
+    request: Request,
 ) -> project.checkRateLimit_service.RateLimitCheckResponse | Response:
     """
     This endpoint checks if the requesting user has exceeded their API request quota. It intercepts API requests, checks the user's request count stored in a database against predefined limits, and returns whether the user can proceed or not. If exceeded, it returns an error message; otherwise, it allows the request to be processed.
     """
     try:
-        res = await project.checkRateLimit_service.checkRateLimit(user_id)
+        res = await project.checkRateLimit_service.checkRateLimit(
+            project.rateLimitMiddleware.rateLimitCaller(request.scope)
+        )
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
+
+
+@app.get(
+    "/rateLimit/usage",
+    response_model=project.getRateLimitUsage_service.RateLimitUsageResponse,
+)
+async def api_get_getRateLimitUsage(
+    user_id: str, hours: int = 24
+) -> project.getRateLimitUsage_service.RateLimitUsageResponse | Response:
+    """
+    Reports how many requests a user made to each API endpoint over the last hours, read from the hourly Log rollups plus the Log rows that have not been rolled up yet.
+    """
+    try:
+        res = await project.getRateLimitUsage_service.getRateLimitUsage(user_id, hours)
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        return project.fastJSON.errorResponse(e)
 
 
 @app.post(
@@ -261,13 +400,7 @@ async def api_post_setUserRateLimit(
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
 
 
 @app.put(
@@ -284,13 +417,7 @@ async def api_put_updateUser(
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
 
 
 @app.get(
@@ -308,13 +435,7 @@ async def api_get_getUserDetails(
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
 
 
 @app.put(
@@ -334,13 +455,7 @@ async def api_put_updateUserDetails(
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
 
 
 @app.get(
@@ -358,10 +473,33 @@ async def api_get_getSystemRateLimits(
         return res
     except Exception as e:
         logger.exception("Error processing request")
-        res = dict()
-        res["error"] = str(e)
-        return Response(
-            content=jsonable_encoder(res),
-            status_code=500,
-            media_type="application/json",
-        )
+        return project.fastJSON.errorResponse(e)
+
+
+@app.get(
+    "/system/stats",
+    response_model=project.getSystemStats_service.SystemStatsResponse,
+)
+async def api_get_getSystemStats() -> (
+    project.getSystemStats_service.SystemStatsResponse | Response
+):
+    """
+    Reports the configuration and runtime counters of the in-process components, such as the upstream joke prefetch buffer and the shared upstream HTTP client. Everything is read from memory, so this endpoint never touches the database or the upstream.
+    """
+    try:
+        res = await project.getSystemStats_service.getSystemStats()
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        return project.fastJSON.errorResponse(e)
+
+
+@app.get("/metrics", response_class=Response)
+async def api_get_metrics() -> Response:
+    """
+    Exposes per-route request counts, status codes and latency histograms, together with database, upstream and serialization timings, in the Prometheus text format.
+    """
+    return Response(
+        content=project.metrics.registry.render(),
+        media_type=project.metrics.PROMETHEUS_CONTENT_TYPE,
+    )
@@ -1,5 +1,6 @@
 import prisma
 import prisma.models
+import project.endpointConfig
 from pydantic import BaseModel
 
 
@@ -19,7 +20,8 @@ async def setUserRateLimit(
     """
     This secured endpoint allows administrators to set or modify the rate limit for a specific user. It requires user ID and
     new rate limit values as inputs. It then updates these values in the database, effectively changing the number of requests
-    a user can make to the API within a defined time frame.
+    a user can make to the API within a defined time frame. The new limit is applied to the endpoint configuration cache,
+    and so to rate-limit enforcement, immediately.
 
     Args:
         user_id (str): The unique identifier of the user for whom the rate limit is to be set or modified.
@@ -30,7 +32,7 @@ async def setUserRateLimit(
         RateLimitModificationResponse: Provides feedback after attempting to set or modify a user's rate limit.
     """
     endpoint = await prisma.models.APIEndpoint.prisma().find_first(
-        where={"Handler": {"FunctionLogs": {"User": {"id": user_id}}}}
+        where={"FunctionLogs": {"some": {"userId": user_id}}}
     )
     if not endpoint:
         return RateLimitModificationResponse(
@@ -42,6 +44,7 @@ async def setUserRateLimit(
         where={"id": endpoint.id}, data={"rateLimit": new_rate_limit}
     )
     if updated_endpoint:
+        project.endpointConfig.endpoint_config.update(updated_endpoint)
         return RateLimitModificationResponse(
             user_id=user_id,
             new_rate_limit=new_rate_limit,
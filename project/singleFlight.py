@@ -0,0 +1,73 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class SingleFlightStats(BaseModel):
+    """
+    Counters for a single-flight group: how many calls were actually made and how many callers shared them.
+    """
+
+    window_seconds: float
+    in_flight: int
+    leaders: int
+    followers: int
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key. The first caller (the leader) starts the call; every caller that
+    arrives while it is running, or within `window` seconds after it succeeded, awaits the same result instead of
+    starting its own. Failures are never shared past the callers that were already waiting on them.
+
+    A caller being cancelled does not cancel the shared call for the others.
+    """
+
+    def __init__(self, window: float = 0.0):
+        self.window = window
+        self.leaders = 0
+        self.followers = 0
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs `fn` unless a call for `key` is already in flight, and returns the shared result.
+
+        Args:
+            key (Hashable): Identifies which calls may be coalesced.
+            fn (Callable[[], Awaitable[T]]): Starts the call when this caller is the leader.
+
+        Returns:
+            T: The result of the shared call.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            self.leaders += 1
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self._settle(key, done))
+        else:
+            self.followers += 1
+        return await asyncio.shield(call)
+
+    def _settle(self, key: Hashable, call: asyncio.Future) -> None:
+        failed = call.cancelled() or call.exception() is not None
+        if self.window > 0 and not failed:
+            asyncio.get_running_loop().call_later(self.window, self._forget, key, call)
+        else:
+            self._forget(key, call)
+
+    def _forget(self, key: Hashable, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> SingleFlightStats:
+        return SingleFlightStats(
+            window_seconds=self.window,
+            in_flight=sum(1 for call in self._calls.values() if not call.done()),
+            leaders=self.leaders,
+            followers=self.followers,
+        )
@@ -3,6 +3,8 @@ from datetime import datetime
 import prisma
 import prisma.enums
 import prisma.models
+import project.passwordHasher
+import project.userCache
 from pydantic import BaseModel
 
 
@@ -32,7 +34,7 @@ async def updateUserDetails(
     userId: str, name: str, password: str, role: prisma.enums.Role
 ) -> UpdateUserResponse:
     """
-    Updates a specific user's details. This endpoint facilitates changes to user profiles, including updating names, passwords, and roles as authorized by admin users.
+    Updates a specific user's details. This endpoint facilitates changes to user profiles, including updating names, passwords, and roles as authorized by admin users. The new password is hashed with bcrypt on the shared password hashing pool.
 
     Args:
         userId (str): The unique identifier for the user to be updated.
@@ -44,16 +46,17 @@ async def updateUserDetails(
         UpdateUserResponse: Model confirming the success of the update or reflecting the updated user details.
     """
     current_time = datetime.now()
-    hashed_password = "hashed_" + password
+    hashed_password = await project.passwordHasher.password_hasher.hash(password)
     updated_user = await prisma.models.User.prisma().update(
         where={"id": userId},
         data={
             "username": name,
-            "password": hashed_password,
+            "passwordHash": hashed_password,
             "role": role,
             "updatedAt": current_time,
         },
     )
+    project.userCache.user_cache.invalidate(userId)
     return UpdateUserResponse(
         success=True,
         message="User details updated successfully.",
@@ -4,6 +4,7 @@ from typing import Optional
 import prisma
 import prisma.enums
 import prisma.models
+import project.userCache
 from pydantic import BaseModel
 
 
@@ -47,6 +48,7 @@ async def updateUser(
     updated_user = await prisma.models.User.prisma().update(
         where={"id": userId}, data=update_data, include={"username": True, "role": True}
     )
+    project.userCache.user_cache.invalidate(userId)
     return UserUpdateResponse(
         id=updated_user.id,
         createdAt=updated_user.createdAt,
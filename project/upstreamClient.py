@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Optional
+
+import httpx
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamClientStats(BaseModel):
+    """
+    Snapshot of the shared upstream HTTP client: pool configuration, utilisation and time spent waiting for a free connection.
+    """
+
+    max_connections: int
+    max_keepalive_connections: int
+    http2: bool
+    in_flight: int
+    utilisation: float
+    requests: int
+    errors: int
+    pool_waits: int
+    pool_timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+class UpstreamClient:
+    """
+    Application-scoped HTTP client for the litellm upstream. A single `httpx.AsyncClient` is shared by all requests
+    so connections are kept alive and reused instead of paying a TCP and TLS handshake per joke.
+
+    Concurrency is capped at `max_connections` by a semaphore in front of the client, which is also where pool
+    utilisation and wait time are measured. Every phase of a request (connect, read, write, waiting for a pooled
+    connection) has its own timeout. `transport` replaces the network transport, e.g. with an in-process stand-in
+    for the upstream in tests and benchmarks.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 5.0,
+        write_timeout: float = 5.0,
+        pool_timeout: float = 1.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=write_timeout,
+            pool=pool_timeout,
+        )
+        self.transport = transport
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.pool_waits = 0
+        self.pool_timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._slots = asyncio.Semaphore(max_connections)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def open(self) -> None:
+        """
+        Creates the underlying connection pool. Called from the application lifespan; `get` also opens the
+        client lazily so scripts can use it outside the server.
+        """
+        if self._client is not None:
+            return
+        if self.http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning(
+                    "HTTP/2 requested but 'h2' is not installed; using HTTP/1.1"
+                )
+                self.http2 = False
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=self.timeout,
+            transport=self.transport,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        )
+
+    async def close(self) -> None:
+        """
+        Closes every pooled connection.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Issues a GET request through the shared pool.
+
+        Args:
+            url (str): The URL to request.
+            **kwargs: Passed through to `httpx.AsyncClient.get`.
+
+        Returns:
+            httpx.Response: The upstream response.
+
+        Raises:
+            httpx.PoolTimeout: If no connection became free within the pool timeout.
+            httpx.RequestError: If the request itself failed.
+        """
+        if self._client is None:
+            await self.open()
+        if self._slots.locked():
+            self.pool_waits += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.timeout.pool)
+            except asyncio.TimeoutError:
+                self.pool_timeouts += 1
+                raise httpx.PoolTimeout("Timed out waiting for an upstream connection.")
+            finally:
+                waited = time.perf_counter() - started
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        else:
+            await self._slots.acquire()
+        self.in_flight += 1
+        self.requests += 1
+        try:
+            return await self._client.get(url, **kwargs)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> UpstreamClientStats:
+        return UpstreamClientStats(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            http2=self.http2,
+            in_flight=self.in_flight,
+            utilisation=self.in_flight / self.max_connections,
+            requests=self.requests,
+            errors=self.errors,
+            pool_waits=self.pool_waits,
+            pool_timeouts=self.pool_timeouts,
+            wait_seconds_total=self.wait_seconds_total,
+            wait_seconds_max=self.wait_seconds_max,
+        )
+
+
+upstream_client = UpstreamClient(
+    max_connections=int(os.environ.get("UPSTREAM_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(
+        os.environ.get("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "10")
+    ),
+    keepalive_expiry=float(os.environ.get("UPSTREAM_KEEPALIVE_EXPIRY_SECONDS", "30")),
+    http2=os.environ.get("UPSTREAM_HTTP2", "false").lower() == "true",
+    connect_timeout=float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT_SECONDS", "2.0")),
+    read_timeout=float(os.environ.get("UPSTREAM_READ_TIMEOUT_SECONDS", "5.0")),
+    write_timeout=float(os.environ.get("UPSTREAM_WRITE_TIMEOUT_SECONDS", "5.0")),
+    pool_timeout=float(os.environ.get("UPSTREAM_POOL_TIMEOUT_SECONDS", "1.0")),
+)
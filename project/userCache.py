@@ -0,0 +1,126 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import prisma
+import prisma.models
+import project.singleFlight
+from pydantic import BaseModel
+
+
+class UserCacheStats(BaseModel):
+    """
+    Size, configuration and effectiveness of the in-process user lookup cache.
+    """
+
+    size: int
+    max_size: int
+    ttl_seconds: float
+    negative_ttl_seconds: float
+    hits: int
+    negative_hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    expirations: int
+    invalidations: int
+
+
+class UserCache:
+    """
+    Bounded LRU cache of User rows by id. Found users are kept for `ttl` seconds and unknown ids for `negative_ttl`
+    seconds, so repeated lookups of a missing user do not reach the database either. Concurrent misses for the same
+    id share one query. Writes made through this process invalidate their entry explicitly; writes made by other
+    instances become visible once the entry expires.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60, negative_ttl: float = 5):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # user id -> (expiry on the monotonic clock, user or None for an unknown id)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._generation = 0
+        self._loads = project.singleFlight.SingleFlight()
+
+    async def _load(self, user_id: str) -> Optional[prisma.models.User]:
+        generation = self._generation
+        user = await prisma.models.User.prisma().find_unique(where={"id": user_id})
+        if generation == self._generation:
+            ttl = self.ttl if user is not None else self.negative_ttl
+            self._entries[user_id] = (time.monotonic() + ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return user
+
+    async def get(self, user_id: str) -> Optional[prisma.models.User]:
+        """
+        Looks a user up by id, from the cache when possible.
+
+        Args:
+            user_id (str): The user's id.
+
+        Returns:
+            Optional[prisma.models.User]: The user, or None if no user has that id.
+        """
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            expires_at, user = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(user_id)
+                if user is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return user
+            del self._entries[user_id]
+            self.expirations += 1
+        self.misses += 1
+        # Keyed on the generation too, so a lookup made after a write never joins a read that started before it.
+        return await self._loads.do(
+            (user_id, self._generation), lambda: self._load(user_id)
+        )
+
+    def invalidate(self, user_id: str) -> None:
+        """
+        Drops a user's entry after the user was changed or deleted. Lookups already in flight will not repopulate
+        the cache with what they read, and later lookups do not share their result.
+
+        Args:
+            user_id (str): The user's id.
+        """
+        self._generation += 1
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> UserCacheStats:
+        lookups = self.hits + self.negative_hits + self.misses
+        return UserCacheStats(
+            size=len(self._entries),
+            max_size=self.max_size,
+            ttl_seconds=self.ttl,
+            negative_ttl_seconds=self.negative_ttl,
+            hits=self.hits,
+            negative_hits=self.negative_hits,
+            misses=self.misses,
+            hit_ratio=(self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            invalidations=self.invalidations,
+        )
+
+
+user_cache = UserCache(
+    max_size=int(os.environ.get("USER_CACHE_MAX_SIZE", "10000")),
+    ttl=float(os.environ.get("USER_CACHE_TTL_SECONDS", "60")),
+    negative_ttl=float(os.environ.get("USER_CACHE_NEGATIVE_TTL_SECONDS", "5")),
+)
@@ -0,0 +1,95 @@
+import base64
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+import prisma
+import prisma.models
+
+MAX_PAGE_SIZE = 1000
+
+
+def encodeCursor(user: prisma.models.User) -> str:
+    """
+    Builds the opaque pagination token that resumes a listing after `user`.
+
+    Args:
+        user (prisma.models.User): The last user of a page.
+
+    Returns:
+        str: A URL-safe cursor token.
+    """
+    key = json.dumps([user.createdAt.isoformat(), user.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decodeCursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Reads a token produced by `encodeCursor`.
+
+    Args:
+        cursor (str): The cursor token.
+
+    Returns:
+        Tuple[datetime, str]: The (createdAt, id) key of the last user already returned.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, user_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(user_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+async def fetchUserPage(
+    limit: int, cursor: Optional[str] = None
+) -> Tuple[List[prisma.models.User], Optional[str]]:
+    """
+    Reads one page of users in (createdAt, id) order using keyset pagination, so every page costs the same index
+    range scan no matter how deep into the table it is.
+
+    Args:
+        limit (int): The page size, clamped to 1..MAX_PAGE_SIZE.
+        cursor (Optional[str]): The `next_cursor` of the previous page, or None for the first page.
+
+    Returns:
+        Tuple[List[prisma.models.User], Optional[str]]: The users and the cursor of the next page, which is None on
+        the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    where = {}
+    if cursor is not None:
+        created_at, user_id = decodeCursor(cursor)
+        where = {
+            "OR": [
+                {"createdAt": {"gt": created_at}},
+                {"createdAt": created_at, "id": {"gt": user_id}},
+            ]
+        }
+    users = await prisma.models.User.prisma().find_many(
+        where=where,
+        order=[{"createdAt": "asc"}, {"id": "asc"}],
+        take=limit + 1,
+    )
+    if len(users) <= limit:
+        return users, None
+    users = users[:limit]
+    return users, encodeCursor(users[-1])
+
+
+async def iterUserPages(
+    page_size: int = MAX_PAGE_SIZE, cursor: Optional[str] = None
+) -> AsyncIterator[List[prisma.models.User]]:
+    """
+    Yields every user from `cursor` onwards, one page at a time, holding only one page in memory.
+
+    Args:
+        page_size (int): How many users to read per query.
+        cursor (Optional[str]): Where to resume, or None to start from the first user.
+    """
+    while True:
+        users, cursor = await fetchUserPage(page_size, cursor)
+        if users:
+            yield users
+        if cursor is None:
+            return